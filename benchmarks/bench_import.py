@@ -0,0 +1,75 @@
+"""Import-time check for the functions package.
+
+Times `import functions` (and importing the light helpers from it) in fresh interpreters and fails when the median
+is over budget or when the import pulls in one of the heavy libraries that should only load on first use.
+
+    python benchmarks/bench_import.py                 # default budget
+    python benchmarks/bench_import.py --budget 0.02 --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Libraries that must not be loaded just by importing the package
+HEAVY = ('numpy', 'pandas', 'scipy', 'matplotlib', 'plotnine', 'statsmodels', 'patchworklib', 'pingouin', 'pyarrow')
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+"""
+
+CASES = {
+    'import functions': 'import functions',
+    'light helpers': 'from functions import write_to_output, ResultWriter, save_plot, render_deferred, PROFILES',
+}
+
+
+def measure(statement, runs):
+    # every run in a new interpreter, so nothing is already imported
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    times, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(statement=statement, heavy=HEAVY)],
+                                capture_output=True, text=True, check=True, env=env, cwd=ROOT).stdout.splitlines()
+        times.append(float(output[0]))
+        loaded.update(name for name in output[1].split(',') if name)
+    return statistics.median(times), sorted(loaded)
+
+
+def slowest_imports(statement, count=10):
+    # the largest cumulative times reported by python -X importtime
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    report = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, env=env, cwd=ROOT).stderr.splitlines()
+    rows = [line.split('|') for line in report if line.startswith('import time:') and 'cumulative' not in line]
+    rows = sorted(rows, key=lambda row: int(row[1]), reverse=True)[:count]
+    return [f'{int(row[1]) / 1e6:8.4f}s {row[2].rstrip()}' for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.1, help='maximum median import time in seconds')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, statement in CASES.items():
+        median, loaded = measure(statement, args.runs)
+        ok = median <= args.budget and not loaded
+        failed |= not ok
+        print(f'{"ok  " if ok else "FAIL"} {name:<16} {median * 1000:8.2f} ms (budget {args.budget * 1000:.0f} ms)'
+              + (f'  loaded: {", ".join(loaded)}' if loaded else ''))
+        if not ok:
+            print('\n'.join('       ' + line for line in slowest_imports(statement)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
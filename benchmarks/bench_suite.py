@@ -0,0 +1,303 @@
+"""Benchmark suite for the functions package.
+
+Times the public functions and Day-script style workflows on synthetic data of increasing size, records peak
+Python memory (tracemalloc) for each, and compares a run against a saved baseline, failing when a tracked path
+got slower (or hungrier) than the tolerance allows.
+
+    python benchmarks/bench_suite.py                                  # 10^3 to 10^5 rows, print the table
+    python benchmarks/bench_suite.py --sizes 1e3,1e5,1e7 --only ols   # cases whose name contains 'ols'
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json --tolerance 0.25
+
+Baselines are machine specific: save one on the machine (and library versions) you compare on.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+from plotnine import ggplot, aes, geom_boxplot, geom_point
+import functions
+import functions.power
+
+# Version of the baseline file layout; baselines written by another version are not compared against
+BASELINE_VERSION = 1
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5)
+# Changes smaller than this many seconds are treated as noise, whatever the ratio
+NOISE_FLOOR = 0.005
+
+
+# Function that makes a synthetic table shaped like the course data: numeric predictors, two crossed factors,
+# a many-level grouping column and a response depending on all of them
+def make_data(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'x1': rng.normal(size=rows),
+        'x2': rng.normal(size=rows),
+        'x3': rng.uniform(size=rows),
+        'sex': rng.choice(['female', 'male'], size=rows),
+        'exercise': rng.choice(['control', 'runner'], size=rows),
+        'group': rng.choice([f'g{i}' for i in range(8)], size=rows),
+    })
+    effect = (data['sex'] == 'male') * 1.5 + (data['exercise'] == 'runner') * -0.8 + data['group'].str[1:].astype(int)
+    data['y'] = 2 + data['x1'] - 0.5 * data['x2'] + effect * 0.3 + rng.normal(size=rows)
+    return data
+
+
+class Case:
+    """One benchmarked call: setup(data, workdir) builds the arguments, run(*arguments) is what gets timed."""
+
+    def __init__(self, name, run, setup=None, max_rows=10 ** 7, sized=True, reset=None):
+        self.name, self.run, self.setup = name, run, setup
+        self.max_rows = max_rows
+        # called (untimed) before every run, e.g. to empty a memo so each run does the full work
+        self.reset = reset or (lambda: None)
+        # cases whose cost does not depend on the table are measured once, at the smallest size
+        self.sized = sized
+
+
+def _fit(data, workdir):
+    return smf.ols('y ~ x1 + x2 + C(group)', data=data).fit(),
+
+
+def _csv(data, workdir):
+    path = os.path.join(workdir, f'table-{len(data)}.csv')
+    if not os.path.exists(path):
+        data.to_csv(path, index=False)
+    return path,
+
+
+def _warm_csv(data, workdir):
+    path, = _csv(data, workdir)
+    functions.load_csv(path, cache_dir=os.path.join(workdir, 'cache'))
+    return path, os.path.join(workdir, 'cache')
+
+
+def _fit_cache(data, workdir):
+    cache = functions.FitCache(os.path.join(workdir, 'fits'))
+    functions.cached_ols('y ~ x1 + x2 + C(group)', data, cache=cache)
+    return data, cache
+
+
+def _text(data, workdir):
+    table = sm.stats.anova_lm(smf.ols('y ~ exercise * sex', data=data).fit(), typ=2).to_string()
+    return os.path.join(workdir, 'output.txt'), table
+
+
+def _write_many(path, text, records=1000):
+    for i in range(records):
+        functions.write_to_output(f'Record {i}', path, text)
+
+
+def _result_writer(path, text, records=1000):
+    with functions.ResultWriter(path) as writer:
+        for i in range(records):
+            writer.write(f'Record {i}', text)
+
+
+# Workflow mirroring scripts/Day3.py: box plot, two-way ANOVA fit, diagnostic plots, ANOVA table to the output file
+def day3_workflow(data, workdir):
+    functions.save_plot(os.path.join(workdir, 'day3-bp.png'),
+                        ggplot(data, aes('sex', 'y', fill='exercise')) + geom_boxplot(), cache=False)
+    lm = smf.ols('y ~ exercise * sex', data=data).fit()
+    functions.dgplots(os.path.join(workdir, ''), 'day3-dg_plots', lm, cache=False)
+    functions.write_to_output('Two-Way ANOVA', os.path.join(workdir, 'day3.txt'),
+                              sm.stats.anova_lm(lm, typ=2).to_string())
+
+
+# Workflow mirroring scripts/Day4.py: power analysis, t-test, box plot and one-way ANOVA
+def day4_workflow(data, workdir):
+    outfile = os.path.join(workdir, 'day4.txt')
+    functions.write_to_output('Sample Size', outfile, str(functions.power_ttest(d=0.5, power=0.80)))
+    ttest = functions.batch_ttest(data[['y']].T, groups=data['sex'])
+    functions.write_to_output('t-Test', outfile, ttest.to_string())
+    functions.save_plot(os.path.join(workdir, 'day4-bp.png'), ggplot(data, aes('group', 'y')) + geom_boxplot(),
+                        cache=False)
+    lm = smf.ols('y ~ C(group)', data=data).fit()
+    functions.write_to_output('ANOVA', outfile, sm.stats.anova_lm(lm).to_string())
+
+
+CASES = [
+    Case('ols_fit', lambda data: smf.ols('y ~ x1 + x2 + C(group)', data=data).fit(), lambda data, workdir: (data,)),
+    Case('anova_lm', lambda fit: sm.stats.anova_lm(fit, typ=2), _fit),
+    Case('cached_ols_hit', lambda data, cache: functions.cached_ols('y ~ x1 + x2 + C(group)', data, cache=cache),
+         _fit_cache),
+    Case('nested_anova', lambda data: functions.NestedModels('y ~ x1 + x2 + C(group)', data).anova(2),
+         lambda data, workdir: (data,)),
+    Case('ols_diagnostics', functions.ols_diagnostics, _fit),
+    Case('get_influence', lambda fit: fit.get_influence().cooks_distance, _fit, max_rows=10 ** 5),
+    Case('dgplots', lambda fit, workdir: functions.dgplots(workdir, 'bench', fit, cache=False),
+         lambda data, workdir: (_fit(data, workdir)[0], os.path.join(workdir, '')), max_rows=10 ** 6),
+    Case('dgplots_composite',
+         lambda fit, workdir: functions.dgplots(workdir, 'bench', fit, cache=False, composite=True),
+         lambda data, workdir: (_fit(data, workdir)[0], os.path.join(workdir, '')), max_rows=10 ** 6),
+    Case('save_plot_boxplot', lambda path, plot: functions.save_plot(path, plot, cache=False),
+         lambda data, workdir: (os.path.join(workdir, 'box.png'), ggplot(data, aes('group', 'y')) + geom_boxplot()),
+         max_rows=10 ** 6),
+    Case('save_plot_scatter', lambda path, plot: functions.save_plot(path, plot, cache=False),
+         lambda data, workdir: (os.path.join(workdir, 'scatter.png'), ggplot(data, aes('x1', 'y')) + geom_point()),
+         max_rows=10 ** 5),
+    Case('write_to_output', _write_many, _text, sized=False),
+    Case('result_writer', _result_writer, _text, sized=False),
+    Case('read_csv', pd.read_csv, _csv),
+    Case('load_csv_cached', lambda path, cache_dir: functions.load_csv(path, cache_dir=cache_dir), _warm_csv),
+    Case('fit_file', lambda path: functions.fit_file('y ~ x1 + x2 + C(group)', path), _csv),
+    Case('batch_ttest', lambda data: functions.batch_ttest(data[['x1', 'x2', 'x3', 'y']].T, groups=data['sex']),
+         lambda data, workdir: (data,)),
+    Case('batch_anova', lambda data: functions.batch_anova(data, dv=['x1', 'x2', 'y'], between='group'),
+         lambda data, workdir: (data,)),
+    Case('correlation', functions.correlation, lambda data, workdir: (data,)),
+    Case('bootstrap_ci', lambda values: functions.bootstrap_ci(values, n_boot=1000, seed=0),
+         lambda data, workdir: (data['y'].to_numpy(),), max_rows=10 ** 5),
+    Case('power_ttest', lambda: functions.power_ttest(d=np.linspace(0.1, 1.5, 1000), power=0.8),
+         lambda data, workdir: (), sized=False, reset=functions.power._MEMO.clear),
+    Case('day3_workflow', day3_workflow, lambda data, workdir: (data, workdir), max_rows=10 ** 6),
+    Case('day4_workflow', day4_workflow, lambda data, workdir: (data, workdir), max_rows=10 ** 6),
+]
+
+
+# Function that times a case (median of `repeat` runs after a warm-up) and measures its peak traced memory
+def measure(case, arguments, repeat, memory=True):
+    case.reset()
+    case.run(*arguments)
+    times = []
+    for _ in range(repeat):
+        case.reset()
+        start = time.perf_counter()
+        case.run(*arguments)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        # a separate run, as tracing allocations slows the code down
+        case.reset()
+        tracemalloc.start()
+        try:
+            case.run(*arguments)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'seconds': statistics.median(times), 'min_seconds': min(times), 'peak_bytes': peak}
+
+
+def run(sizes, only=None, repeat=3, memory=True, log=print):
+    results = {}
+    cases = [case for case in CASES if not only or any(name in case.name for name in only)]
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            data = make_data(rows)
+            for case in cases:
+                if rows > case.max_rows or (not case.sized and rows != min(sizes)):
+                    continue
+                key = f'{case.name}[{rows}]' if case.sized else case.name
+                result = measure(case, case.setup(data, workdir) if case.setup else (data,), repeat, memory)
+                results[key] = dict(result, case=case.name, rows=rows if case.sized else None)
+                log(_format_row(key, result))
+    return results
+
+
+def _format_row(key, result, note=''):
+    peak = result['peak_bytes']
+    memory = f'{peak / 2 ** 20:10.1f} MB' if peak is not None else ' ' * 13
+    return f'{key:<34} {result["seconds"] * 1000:12.2f} ms {memory}{note}'
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=ROOT).stdout.strip()
+    except OSError:
+        commit = None
+    import plotnine
+    import statsmodels
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'statsmodels': statsmodels.__version__,
+        'plotnine': plotnine.__version__,
+    }
+
+
+def save_baseline(path, results):
+    baseline = {'version': BASELINE_VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'environment': _environment(), 'results': results}
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+
+
+# Function that lists the tracked paths that are slower, or use more memory, than the baseline allows
+def compare(baseline, results, tolerance, memory_tolerance):
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"baseline has version {baseline.get('version')}, expected {BASELINE_VERSION}; "
+                         f"save a new one with --save-baseline")
+    regressions = []
+    for key, result in results.items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        slower = result['seconds'] - previous['seconds']
+        if slower > NOISE_FLOOR and result['seconds'] > previous['seconds'] * (1 + tolerance):
+            regressions.append(f'{key}: {previous["seconds"] * 1000:.2f} -> {result["seconds"] * 1000:.2f} ms '
+                               f'(+{slower / previous["seconds"]:.0%})')
+        if (result['peak_bytes'] is not None and previous.get('peak_bytes')
+                and result['peak_bytes'] > previous['peak_bytes'] * (1 + memory_tolerance)):
+            regressions.append(f'{key}: peak {previous["peak_bytes"] / 2 ** 20:.1f} -> '
+                               f'{result["peak_bytes"] / 2 ** 20:.1f} MB')
+    return regressions
+
+
+def _sizes(text):
+    return sorted({int(float(size)) for size in text.split(',')})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=_sizes, default=DEFAULT_SIZES, help='comma separated row counts, e.g. 1e3,1e7')
+    parser.add_argument('--only', type=lambda text: text.split(','), help='run cases whose name contains one of these')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case (the median is kept)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc run')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as a new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='fail if a case is slower than in this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown (default 20%%)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='allowed relative growth of peak memory')
+    parser.add_argument('--output', metavar='PATH', help='also write this run to a JSON file')
+    args = parser.parse_args(argv)
+
+    print(f'{"case[rows]":<34} {"median":>15} {"peak":>13}')
+    results = run(args.sizes, args.only, args.repeat, args.memory)
+    if args.output:
+        save_baseline(args.output, results)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f'baseline written to {args.save_baseline}')
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), results, args.tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f'FAIL {regression}')
+        if regressions:
+            return 1
+        print(f'ok   no case slower than the baseline by more than {args.tolerance:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Checks that the package's content-addressed caches key on everything that changes their output.
+
+Each check builds the same thing twice in fresh interpreters (the key must not change) and then with one edit
+(the key must change), and the script exits 1 if any check fails.
+
+    python benchmarks/check_cache_keys.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PLOT = """
+import pandas as pd
+from plotnine import *
+from functions import mean_cl_boot
+from functions.render_cache import plot_key
+data = pd.DataFrame({{'x': list('aabb'), 'y': [1.0, 2.0, 3.0, 4.0], 'g': list('cdcd')}})
+plot = (ggplot(data, aes('x', 'y', colour='g')) + geom_point() + annotate('text', x=1, y=2, label=[{label!r}])
+        + stat_summary(fun_data=mean_cl_boot, geom='line') + theme_bw()
+        + theme(axis_text_x=element_text(angle={angle})))
+print(plot_key(plot, dpi=100))
+"""
+
+_TASK = """
+import statsmodels.formula.api as smf
+from functions import Pipeline
+pipeline = Pipeline('/nonexistent')
+
+@pipeline.task()
+def fit():
+    return smf.ols('light ~ depth', data=None).fit()
+
+@pipeline.task(deps=['fit'])
+def summary(fit):
+    return {body}
+
+print(pipeline._fingerprints(['fit', 'summary'])['summary'])
+"""
+
+_PANELS = """
+import numpy as np
+from functions.dgplots import _panel_keys
+from functions.diagnostics import Diagnostics
+{edit}
+diagnostics = Diagnostics(*np.linspace(0, 1, 50).reshape(5, 10))
+print(_panel_keys(diagnostics, {{'aggregate': True}}, {{'dpi': 100}})['QQ_plot'])
+"""
+
+# Each check: the unedited source, then the edits that must each give a different key
+CHECKS = {
+    'render key': (_PLOT.format(label='before', angle=90),
+                   {'annotate label': _PLOT.format(label='AFTER EDIT', angle=90),
+                    'theme angle': _PLOT.format(label='before', angle=45)}),
+    'pipeline fingerprint': (_TASK.format(body='fit.rsquared'),
+                             {'attribute read': _TASK.format(body='fit.rsquared_adj'),
+                              'global called': _TASK.format(body='len(fit.params)'),
+                              'nested code': _TASK.format(body='[value.rsquared for value in [fit]]')}),
+    'dgplots panel key': (_PANELS.format(edit=''),
+                          {'smoother code': _PANELS.format(edit='from functions import smoothers as m\n'
+                                                                     'm._bin_index.__code__ = (lambda: 0).__code__'),
+                           'sketch code': _PANELS.format(edit='from functions import quantile_sketch as m\n'
+                                                              'm.qq_frame.__code__ = (lambda: 0).__code__'),
+                           'plotnine version': _PANELS.format(edit='import plotnine; plotnine.__version__ = "0.0"')}),
+}
+
+
+def key(source):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    return subprocess.run([sys.executable, '-c', source], capture_output=True, text=True, check=True, env=env,
+                          cwd=ROOT).stdout.splitlines()[-1]
+
+
+def main():
+    failed = False
+    for name, (source, edits) in CHECKS.items():
+        original = key(source)
+        stable = key(source) == original
+        failed |= not stable
+        print(f'{"ok  " if stable else "FAIL"} {name}: same input, same key across interpreters')
+        for edit, edited in edits.items():
+            changed = key(edited) != original
+            failed |= not changed
+            print(f'{"ok  " if changed else "FAIL"} {name}: {edit} changes the key')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
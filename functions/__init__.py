@@ -1,6 +1,62 @@
-from .dgplots import dgplots
-from.add_to_txt_file import write_to_output
-from .save_plot import save_plot
+import importlib
+import os
+import sys
+import types
 
-__all__ = ['dgplots', 'write_to_output', 'save_plot']
+# Public names and the submodule each lives in; submodules (and their statsmodels/plotnine/scipy imports) are only
+# loaded when one of their names is first used, so `import functions` stays cheap
+_LAZY = {
+    'dgplots': 'dgplots',
+    'write_to_output': 'add_to_txt_file', 'ResultWriter': 'add_to_txt_file',
+    'ResultsStore': 'results_store',
+    'save_plot': 'save_plot', 'ExportQueue': 'save_plot', 'render_deferred': 'save_plot',
+    'PROFILES': 'render_profiles',
+    'batch_ttest': 'batch_tests', 'batch_anova': 'batch_tests', 'batch_kruskal': 'batch_tests',
+    'power_ttest': 'power', 'power_anova': 'power',
+    'simulate_power': 'simulate_power', 'required_n': 'simulate_power',
+    'bootstrap_ci': 'bootstrap', 'mean_cl_boot': 'bootstrap', 'boot_summary': 'bootstrap',
+    'cohen_d_ci': 'bootstrap', 'coef_ci': 'bootstrap',
+    'load_csv': 'data_cache',
+    'ols_diagnostics': 'diagnostics', 'Diagnostics': 'diagnostics',
+    'Pipeline': 'pipeline',
+    'NestedModels': 'nested_models',
+    'StreamingOLS': 'streaming_ols', 'fit_file': 'streaming_ols', 'fit_files': 'streaming_ols',
+    'correlation': 'correlation', 'top_correlations': 'correlation',
+    'cached_ols': 'fit_cache', 'FitCache': 'fit_cache',
+    'QuantileSketch': 'quantile_sketch', 'qq_plot': 'quantile_sketch',
+    'binned_smooth': 'smoothers',
+    'span': 'tracing', 'traced': 'tracing', 'enable_tracing': 'tracing', 'disable_tracing': 'tracing',
+    'export_trace': 'tracing', 'trace_summary': 'tracing', 'reset_trace': 'tracing',
+    'enable_batch_mode': 'batch_mode', 'disable_batch_mode': 'batch_mode', 'render_batch': 'batch_mode',
+}
 
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_LAZY[name]}', __name__), name)
+    # cache it, so later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # loading a submodule binds it on the package; keep the public names that share a submodule's name
+        # (dgplots, save_plot, simulate_power, correlation) pointing at the functions
+        if name in _LAZY and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+# a traced run starts recording (and wraps pandas/statsmodels/plotnine) as soon as the package is imported
+if os.environ.get('FUNCTIONS_TRACE'):
+    importlib.import_module('.tracing', __name__)
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import re
+import time
+import types
+
+# Attributes that hold runtime state rather than anything that changes the output
+_SKIP_ATTRS = {'environment', 'layout', 'figure', 'axs', 'plot', 'theme_targets'}
+_ADDRESS = re.compile(r' at 0x[0-9a-fA-F]+')
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+# Function that feeds a DataFrame or Series into a hash by content, without going through its text repr; columns are
+# taken in sorted order, since frames built from dicts or sets (e.g. annotate() layers) order them arbitrarily
+def hash_frame(h, frame):
+    import pandas as pd
+    if isinstance(frame, pd.Series):
+        h.update(repr((frame.name, frame.dtype)).encode())
+        h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        return h
+    columns = sorted(set(frame.columns), key=repr)
+    h.update(repr([(column, list(frame[[column]].dtypes)) for column in columns]).encode())
+    h.update(pd.util.hash_pandas_object(frame.index).to_numpy().tobytes())
+    for column in columns:
+        h.update(pd.util.hash_pandas_object(frame[column], index=False).to_numpy().tobytes())
+    return h
+
+
+def hash_arrays(h, *arrays):
+    import numpy as np
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(repr((array.dtype.str, array.shape)).encode())
+        h.update(array.tobytes())
+    return h
+
+
+# Function that feeds an arbitrary object tree (e.g. a ggplot spec) into a hash, walking every attribute (private
+# ones included) to the bottom so that no change to the spec goes unnoticed; only cycles are cut short
+def hash_object(h, obj, _seen=None):
+    # numpy and pandas are imported here rather than at the top, so `import functions` does not load them
+    import numpy as np
+    import pandas as pd
+    # maps id -> object, holding on to the objects so their ids are not reused by temporaries
+    _seen = {} if _seen is None else _seen
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        hash_frame(h, obj)
+    elif isinstance(obj, np.ndarray):
+        hash_arrays(h, obj)
+    elif obj is None or isinstance(obj, (str, bytes, int, float, bool, complex)):
+        h.update(repr(obj).encode())
+    elif id(obj) in _seen:
+        # already hashed in full further up or earlier in the walk
+        h.update(b'<seen>' + type(obj).__qualname__.encode())
+    elif isinstance(obj, dict):
+        _seen[id(obj)] = obj
+        h.update(b'{')
+        for key in sorted(obj, key=repr):
+            h.update(repr(key).encode())
+            hash_object(h, obj[key], _seen)
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        _seen[id(obj)] = obj
+        h.update(b'[')
+        for item in (sorted(obj, key=repr) if isinstance(obj, (set, frozenset)) else obj):
+            hash_object(h, item, _seen)
+        h.update(b']')
+    elif isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType, types.MethodType)):
+        h.update(f'{getattr(obj, "__module__", "")}.{getattr(obj, "__qualname__", repr(obj))}'.encode())
+        if isinstance(obj, types.FunctionType):
+            # closures such as palettes differ only in the values they captured
+            _seen[id(obj)] = obj
+            hash_object(h, obj.__code__, _seen)
+            cells = [cell.cell_contents for cell in obj.__closure__ or ()]
+            hash_object(h, [obj.__defaults__, cells], _seen)
+    elif isinstance(obj, types.CodeType):
+        # the bytecode alone does not say which attributes and globals it looks up, or which locals it uses;
+        # code objects of nested functions and comprehensions sit in co_consts and are hashed the same way
+        h.update(obj.co_code)
+        hash_object(h, [obj.co_names, obj.co_varnames, obj.co_freevars, obj.co_cellvars, obj.co_consts], _seen)
+    elif hasattr(obj, '__dict__') or hasattr(type(obj), '__slots__'):
+        _seen[id(obj)] = obj
+        h.update(type(obj).__qualname__.encode())
+        attrs = dict(getattr(obj, '__dict__', {}))
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if slot not in ('__dict__', '__weakref__') and hasattr(obj, slot):
+                    attrs[slot] = getattr(obj, slot)
+        hash_object(h, {key: value for key, value in attrs.items() if key not in _SKIP_ATTRS}, _seen)
+    else:
+        h.update(_ADDRESS.sub('', repr(obj)).encode())
+    return h
+
+
+# Function that deletes the least recently used files in a directory until it fits within max_bytes / max_age
+def prune_directory(directory, max_bytes=None, max_age=None):
+    entries = []
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            continue  # removed by another process in the meantime
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    for mtime, size, path in entries:
+        too_old = max_age is not None and now - mtime > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+# Function that marks a cache entry as recently used
+def touch(path):
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
@@ -1,9 +1,119 @@
+import os
+import threading
+import time
+
+
+# Function that formats one titled block of output text
+def format_record(title, text):
+    return (title + '\n'
+            + '..........\n'
+            + text + '\n'  # Write the ANOVA results
+            + '----------\n' * 2)  # Write two lines of dashes
+
 
 # Function to add lines of text to a txt file
 def write_to_output(title, filename, text):
     with open(filename, 'a') as file:
-        file.write(title + '\n')
-        file.write('..........\n')
-        file.write(text + '\n')  # Write the ANOVA results
-        file.write('----------\n' * 2)  # Write two lines of dashes
+        file.write(format_record(title, text))
+
+
+class ResultWriter:
+    """Keeps one handle on an output file and writes records to it in batches.
+
+    Records are buffered in memory and flushed once ``max_records`` are waiting or ``max_seconds`` have passed
+    since the last flush, and always on close; a background thread does the time-based flush, so a record
+    reaches the file within ``max_seconds`` even if no further write comes. Writes from several threads are
+    serialised with a lock; worker processes write through :meth:`process_writer`, whose records are drained by
+    a background thread here.
+    """
+
+    def __init__(self, filename, max_records=100, max_seconds=5.0, fsync=False, mode='a'):
+        self.filename = filename
+        self.max_records = max_records
+        self.max_seconds = max_seconds
+        self.fsync = fsync
+        self._file = open(filename, mode)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._manager = None
+        self._queue = None
+        self._listener = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, title, text):
+        with self._lock:
+            self._buffer.append(format_record(title, text))
+            if (len(self._buffer) >= self.max_records
+                    or time.monotonic() - self._last_flush >= self.max_seconds):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def _flush_periodically(self):
+        # wake up when the oldest buffered record is due, until close() sets _closed
+        timeout = self.max_seconds
+        while not self._closed.wait(timeout):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._last_flush >= self.max_seconds:
+                    self._flush_locked()
+                timeout = (self._last_flush + self.max_seconds - time.monotonic() if self._buffer
+                           else self.max_seconds)
+
+    def process_writer(self):
+        # picklable handle for worker processes; everything they send ends up in this writer
+        if self._queue is None:
+            import multiprocessing
+            self._manager = multiprocessing.Manager()
+            self._queue = self._manager.Queue()
+            self._listener = threading.Thread(target=self._drain, daemon=True)
+            self._listener.start()
+        return QueueWriter(self._queue)
+
+    def _drain(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            self.write(*record)
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._listener is not None:
+            self._queue.put(None)
+            self._listener.join()
+            self._manager.shutdown()
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self._file.close()
+
+
+class QueueWriter:
+    """Write handle used inside worker processes; sends records to the parent's ResultWriter."""
+
+    def __init__(self, record_queue):
+        self._queue = record_queue
 
+    def write(self, title, text):
+        self._queue.put((title, text))
@@ -0,0 +1,134 @@
+"""Headless batch mode: plots that a script would show in a window are written to files instead.
+
+    python -m functions.batch_mode scripts/Day1.py                      # PNGs in outputs/
+    python -m functions.batch_mode --profile draft --workers 8 scripts/Day2.py
+
+or, from inside a script, call enable_batch_mode() before the first .show(). Every shown plot is queued under a
+deterministic name, outputs/<script>-<NNN>-<title>.png, and the queue is rendered in parallel when the script ends.
+"""
+import argparse
+import atexit
+import copy
+import os
+import re
+import runpy
+import sys
+from .save_plot import ExportQueue
+
+# Plots intercepted from .show() calls, waiting to be rendered
+batch_queue = ExportQueue()
+
+_settings = {'output_dir': 'outputs', 'script': 'batch', 'profile': None, 'workers': None}
+_shown = 0
+_patched = []
+
+
+# Function that turns a title into a short, file-name safe slug
+def _slug(title, default):
+    return re.sub(r'[^a-z0-9]+', '-', str(title).lower()).strip('-')[:60] or default
+
+
+# Function that returns the deterministic file name for the next shown plot
+def _next_filename(slug):
+    global _shown
+    _shown += 1
+    return os.path.join(_settings['output_dir'], f"{_settings['script']}-{_shown:03d}-{slug}.png")
+
+
+# Function that stands in for ggplot.show(): queue the plot under the next file name instead of opening a window
+def _show(plot, *args, **kwargs):
+    labels = getattr(plot, 'labels', None)
+    title = labels.get('title', None) if labels is not None else None
+    if not title:
+        # untitled plots are named after their x and y mappings
+        mapping = getattr(plot, 'mapping', None) or {}
+        title = '-'.join(str(mapping[axis]) for axis in ('x', 'y') if axis in mapping)
+    # a copy, so later in-place changes to the plot (plot += ...) do not leak into the queued render
+    batch_queue.add(_next_filename(_slug(title, 'plot')), copy.deepcopy(plot), _settings['profile'])
+
+
+# Function that stands in for matplotlib's pyplot.show(): save every open figure straight away and close it
+def _show_figures(*args, **kwargs):
+    import matplotlib.pyplot as plt
+    for number in plt.get_fignums():
+        figure = plt.figure(number)
+        figure.savefig(_next_filename(_slug(figure.get_suptitle(), 'figure')))
+        plt.close(figure)
+
+
+def _patch(owner, attribute, replacement):
+    _patched.append((owner, attribute, getattr(owner, attribute)))
+    setattr(owner, attribute, replacement)
+
+
+def enable_batch_mode(output_dir='outputs', script=None, profile=None, workers=None, render_at_exit=True):
+    """Switch matplotlib to the Agg backend and send every ggplot/composition .show() to the batch queue.
+
+    Files are named after ``script`` (the running script's name by default). Unless ``render_at_exit`` is False,
+    the queue is rendered with ``workers`` processes when the interpreter exits; otherwise call render_batch().
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from plotnine import ggplot
+
+    if script is None:
+        script = os.path.splitext(os.path.basename(sys.argv[0] or ''))[0] or 'batch'
+    global _shown
+    _settings.update(output_dir=output_dir, script=script, profile=profile, workers=workers)
+    _shown = 0
+    os.makedirs(output_dir, exist_ok=True)
+    if not _patched:
+        _patch(ggplot, 'show', _show)
+        try:
+            from plotnine.composition import Compose
+        except ImportError:
+            pass
+        else:
+            _patch(Compose, 'show', _show)
+        _patch(plt, 'show', _show_figures)
+        if render_at_exit:
+            atexit.register(render_batch)
+
+
+def disable_batch_mode():
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+    atexit.unregister(render_batch)
+
+
+# Function that renders every queued plot, in parallel, and returns the files written
+def render_batch(workers=None, cache=True, force=False):
+    if not len(batch_queue):
+        return []
+    return batch_queue.render(workers=workers or _settings['workers'], cache=cache, force=force)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m functions.batch_mode',
+                                     description='Run a script headless, writing the plots it shows to files.')
+    parser.add_argument('--output-dir', default='outputs')
+    parser.add_argument('--profile', help="render profile for the files, e.g. 'draft' or 'final'")
+    parser.add_argument('--workers', type=int, help='processes rendering the queue (default: one per core)')
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='arguments passed on to the script')
+    args = parser.parse_args(argv)
+
+    script = os.path.splitext(os.path.basename(args.script))[0]
+    enable_batch_mode(args.output_dir, script=script, profile=args.profile, workers=args.workers,
+                      render_at_exit=False)
+    # run it as `python script.py args` would: as __main__, with its own argv and its directory on the path
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    finally:
+        # whatever the script managed to show before it stopped is still written
+        filenames = render_batch(args.workers)
+        print(f'{len(filenames)} plots written to {args.output_dir}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
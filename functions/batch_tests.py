@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+# Function that returns per-row count, mean and variance (ddof=1), ignoring NaNs only when there are any
+def _row_moments(values):
+    if np.isnan(values).any():
+        n = np.sum(~np.isnan(values), axis=1)
+        return n, np.nanmean(values, axis=1), np.nanvar(values, axis=1, ddof=1)
+    n = np.full(values.shape[0], values.shape[1])
+    return n, values.mean(axis=1), values.var(axis=1, ddof=1)
+
+
+def _as_rows(values):
+    values = np.asarray(values, dtype=float)
+    return values.reshape(1, -1) if values.ndim == 1 else values
+
+
+# Function that converts t statistics into p-values and confidence intervals for one alternative
+def _p_and_ci(tval, dof, estimate, se, alternative, confidence):
+    if alternative == "two-sided":
+        pval = 2 * stats.t.sf(np.abs(tval), dof)
+        tcrit = stats.t.ppf(1 - (1 - confidence) / 2, dof)
+    elif alternative == "greater":
+        pval = stats.t.sf(tval, dof)
+        tcrit = stats.t.ppf(confidence, dof)
+    elif alternative == "less":
+        pval = stats.t.cdf(tval, dof)
+        tcrit = stats.t.ppf(confidence, dof)
+    else:
+        raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+    lower, upper = estimate - tcrit * se, estimate + tcrit * se
+    if alternative == "greater":
+        upper = np.full_like(upper, np.inf)
+    elif alternative == "less":
+        lower = np.full_like(lower, -np.inf)
+    return pval, lower, upper
+
+
+def batch_ttest(x, y=0, groups=None, levels=None, paired=False, correction="auto", alternative="two-sided",
+                confidence=0.95, features=None):
+    """One-sample, paired or two-sample t-tests for every row of a features x samples array at once.
+
+    ``y`` is either a scalar (one-sample test against that mean) or a second features x samples array.
+    Alternatively pass ``groups``, one label per column of ``x``, to split the columns into the two samples
+    (in the order of ``levels``, sorted labels by default). Statistics follow ``pingouin.ttest`` and Cohen's d
+    follows ``pingouin.compute_effsize``; NaNs are dropped per feature (per pair when paired).
+    """
+    if isinstance(x, pd.DataFrame):
+        features = x.index if features is None else features
+    x = _as_rows(x)
+
+    if groups is not None:
+        groups = np.asarray(groups)
+        levels = np.unique(groups) if levels is None else levels
+        if len(levels) != 2:
+            raise ValueError("groups must contain exactly two levels.")
+        x, y = x[:, groups == levels[0]], x[:, groups == levels[1]]
+
+    if np.ndim(y) == 0:
+        # one-sample test against the value y
+        n, mean, var = _row_moments(x)
+        dof = n - 1
+        sd = np.sqrt(var)
+        se = sd / np.sqrt(n)
+        estimate = mean
+        tval = (mean - y) / se
+        cohen_d = (mean - y) / sd
+    else:
+        y = _as_rows(y)
+        if paired:
+            if x.shape != y.shape:
+                raise ValueError("paired tests need x and y of the same shape.")
+            # drop incomplete pairs from both samples
+            missing = np.isnan(x) | np.isnan(y)
+            if missing.any():
+                x, y = np.where(missing, np.nan, x), np.where(missing, np.nan, y)
+            n, mean_diff, var_diff = _row_moments(x - y)
+            _, mean_x, var_x = _row_moments(x)
+            _, mean_y, var_y = _row_moments(y)
+            dof = n - 1
+            se = np.sqrt(var_diff / n)
+            estimate = mean_diff
+            tval = mean_diff / se
+            cohen_d = (mean_x - mean_y) / np.sqrt((var_x + var_y) / 2)
+        else:
+            nx, mean_x, var_x = _row_moments(x)
+            ny, mean_y, var_y = _row_moments(y)
+            pooled_dof = nx + ny - 2
+            pooled_var = ((nx - 1) * var_x + (ny - 1) * var_y) / pooled_dof
+            welch = np.broadcast_to(correction is True or (correction == "auto") & (nx != ny), nx.shape)
+            vnx, vny = var_x / nx, var_y / ny
+            se = np.where(welch, np.sqrt(vnx + vny), np.sqrt(pooled_var * (1 / nx + 1 / ny)))
+            dof = np.where(welch, (vnx + vny) ** 2 / (vnx ** 2 / (nx - 1) + vny ** 2 / (ny - 1)), pooled_dof)
+            estimate = mean_x - mean_y
+            tval = estimate / se
+            cohen_d = estimate / np.sqrt(pooled_var)
+
+    pval, lower, upper = _p_and_ci(tval, dof, estimate, se, alternative, confidence)
+    ci_name = "CI%.0f" % (100 * confidence)
+    return pd.DataFrame({
+        "T": tval,
+        "dof": dof.astype(float),
+        "alternative": alternative,
+        "p_val": pval,
+        f"{ci_name}_lower": lower,
+        f"{ci_name}_upper": upper,
+        "cohen_d": np.abs(cohen_d),
+    }, index=features)
+
+
+# Function that picks the response columns and encodes the grouping column as integer codes
+def _responses_and_groups(data, dv, between):
+    if dv is None:
+        dv = [column for column in data.select_dtypes('number').columns if column != between]
+    elif isinstance(dv, str):
+        dv = [dv]
+    codes, levels = pd.factorize(data[between])
+    values = data[dv].to_numpy(dtype=float)
+    # rows without a group are left out of every response
+    values = values[codes >= 0]
+    codes = codes[codes >= 0]
+    return list(dv), values, codes, len(levels)
+
+
+# Function that returns per-group counts and sums (k x responses), skipping NaNs, via one matrix product
+def _group_sums(values, codes, n_groups):
+    onehot = np.zeros((len(codes), n_groups))
+    onehot[np.arange(len(codes)), codes] = 1.0
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    return onehot.T @ present, onehot.T @ filled, filled, present
+
+
+def batch_anova(data, dv=None, between=None):
+    """One-way ANOVA of many response columns against the same grouping column, without looping over columns.
+
+    Returns one row per response with the columns of ``pingouin.anova``: ddof1, ddof2, F, p_unc and np2 (eta-squared).
+    NaNs are dropped per response.
+    """
+    dv, values, codes, n_groups = _responses_and_groups(data, dv, between)
+    # centring each response first keeps the sums-of-squares identities accurate
+    values = values - np.nanmean(values, axis=0)
+    counts, sums, filled, present = _group_sums(values, codes, n_groups)
+
+    n = counts.sum(axis=0).astype(int)
+    k = (counts > 0).sum(axis=0)
+    between_ss_raw = (sums ** 2 / np.where(counts > 0, counts, 1)).sum(axis=0)
+    ss_between = between_ss_raw - sums.sum(axis=0) ** 2 / n
+    ss_within = (filled ** 2).sum(axis=0) - between_ss_raw
+    ddof1, ddof2 = k - 1, n - k
+    fval = (ss_between / ddof1) / (ss_within / ddof2)
+    return pd.DataFrame({
+        "Source": between,
+        "ddof1": ddof1,
+        "ddof2": ddof2,
+        "F": fval,
+        "p_unc": stats.f.sf(fval, ddof1, ddof2),
+        "np2": ss_between / (ss_between + ss_within),
+    }, index=pd.Index(dv, name="dv"))
+
+
+# Function that returns, per column, the sum of t^3 - t over groups of tied values (for the Kruskal-Wallis correction)
+def _tie_sums(values):
+    ordered = np.sort(values, axis=0)
+    new_run = np.ones(ordered.shape, dtype=bool)
+    new_run[1:] = ordered[1:] != ordered[:-1]
+    # walk the columns one after another; the first row of each column always starts a new run
+    run_id = np.cumsum(new_run.ravel(order='F')) - 1
+    run_sizes = np.bincount(run_id, weights=~np.isnan(ordered).ravel(order='F'))
+    run_column = np.repeat(np.arange(ordered.shape[1]), ordered.shape[0])[new_run.ravel(order='F')]
+    return np.bincount(run_column, weights=run_sizes ** 3 - run_sizes, minlength=ordered.shape[1])
+
+
+def batch_kruskal(data, dv=None, between=None):
+    """Kruskal-Wallis H test of many response columns against the same grouping column.
+
+    Columns are ranked all at once; returns ddof1, H and p_unc per response as ``pingouin.kruskal`` does, plus
+    eta-squared based on H. NaNs are dropped per response.
+    """
+    dv, values, codes, n_groups = _responses_and_groups(data, dv, between)
+    ranks = stats.rankdata(values, axis=0, nan_policy='omit')
+    counts, rank_sums, _, _ = _group_sums(ranks, codes, n_groups)
+
+    n = counts.sum(axis=0).astype(int)
+    k = (counts > 0).sum(axis=0)
+    hval = 12 / (n * (n + 1)) * (rank_sums ** 2 / np.where(counts > 0, counts, 1)).sum(axis=0) - 3 * (n + 1)
+    hval /= 1 - _tie_sums(values) / (n ** 3 - n)
+    ddof1 = k - 1
+    return pd.DataFrame({
+        "Source": between,
+        "ddof1": ddof1,
+        "H": hval,
+        "p_unc": stats.chi2.sf(hval, ddof1),
+        "eta2": (hval - k + 1) / (n - k),
+    }, index=pd.Index(dv, name="dv"))
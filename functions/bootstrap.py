@@ -0,0 +1,227 @@
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Summaries already computed by mean_cl_boot, so the point and line layers of a plot share one bootstrap
+_SUMMARIES = OrderedDict()
+SUMMARY_CACHE_SIZE = 10_000
+
+# Number of resampled values held in memory at once; resamples and jackknife rows are evaluated in batches this big
+BATCH_ELEMENTS = 2 ** 22
+
+
+# Function that draws an n_boot x n matrix of resample indices from a numpy Generator or RandomState
+def resample_indices(n, n_boot, rng):
+    if isinstance(rng, np.random.Generator):
+        return rng.integers(0, n, size=(n_boot, n))
+    return rng.randint(0, n, size=(n_boot, n))
+
+
+def _generator(random_state):
+    # plotnine hands over the np.random module itself when no random_state is set
+    if random_state is None or random_state is np.random:
+        return np.random.default_rng()
+    if isinstance(random_state, (np.random.Generator, np.random.RandomState)):
+        return random_state
+    return np.random.default_rng(random_state)
+
+
+# Function that splits n_boot resamples of n values into batch sizes that keep BATCH_ELEMENTS values in memory
+def _batches(n_boot, n):
+    size = max(1, BATCH_ELEMENTS // max(n, 1))
+    return [min(size, n_boot - start) for start in range(0, n_boot, size)]
+
+
+# Function that returns leave-one-out index rows: row i holds every index except rows[i]
+def _jackknife_indices(n, rows):
+    base = np.arange(n - 1)
+    return base + (base >= rows[:, None])
+
+
+# Function that returns the mean and the variance (ddof=1) of a sample with each value left out in turn, in O(n)
+def _loo_moments(values):
+    n = len(values)
+    # centred first, so the sums of squares do not cancel catastrophically
+    centre = values.mean()
+    centred = values - centre
+    means = (centred.sum() - centred) / (n - 1)
+    squares = (centred ** 2).sum() - centred ** 2 - (n - 1) * means ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return means + centre, squares / (n - 2)
+
+
+# Function that returns the leave-one-out values of a statistic: closed form for means, variances and standard
+# deviations, otherwise evaluated over batches of leave-one-out rows
+def _jackknife(values, statistic):
+    n = len(values)
+    if statistic in (np.mean, np.nanmean):
+        return _loo_moments(values)[0]
+    if statistic in (np.var, np.nanvar, np.std, np.nanstd):
+        # these default to ddof=0: rescale from the n - 2 denominator to n - 1
+        variances = _loo_moments(values)[1] * (n - 2) / (n - 1)
+        return np.sqrt(variances) if statistic in (np.std, np.nanstd) else variances
+    rows = np.arange(n)
+    batches = np.cumsum([0] + _batches(n, n - 1))
+    return np.concatenate([statistic(values[_jackknife_indices(n, rows[start:stop])], axis=1)
+                           for start, stop in zip(batches[:-1], batches[1:])])
+
+
+# Function that returns lower and upper confidence limits for every column of a matrix of bootstrap statistics
+def _interval(boot, estimate, confidence, method, jackknife=None):
+    alpha = (1 - confidence) / 2
+    if method == "percentile":
+        levels = np.array([alpha, 1 - alpha])[:, None] * np.ones(boot.shape[1])
+    elif method == "bca":
+        # bias correction from the share of resamples below the estimate, acceleration from the jackknife
+        z0 = stats.norm.ppf(np.mean(boot < estimate, axis=0) + np.mean(boot == estimate, axis=0) / 2)
+        deviations = jackknife.mean(axis=0) - jackknife
+        acceleration = (deviations ** 3).sum(axis=0) / (6 * ((deviations ** 2).sum(axis=0)) ** 1.5)
+        z = stats.norm.ppf([alpha, 1 - alpha])[:, None]
+        levels = stats.norm.cdf(z0 + (z0 + z) / (1 - acceleration * (z0 + z)))
+    else:
+        raise ValueError("method must be 'percentile' or 'bca'")
+    levels = np.nan_to_num(levels, nan=0.5)
+    lower = [np.nanquantile(boot[:, j], levels[0, j]) for j in range(boot.shape[1])]
+    upper = [np.nanquantile(boot[:, j], levels[1, j]) for j in range(boot.shape[1])]
+    return np.array(lower), np.array(upper)
+
+
+def bootstrap_ci(values, statistic=np.mean, n_boot=1000, confidence=0.95, method="percentile", seed=None):
+    """Bootstrap confidence interval of a statistic of one sample.
+
+    ``statistic`` must reduce along an ``axis`` argument (np.mean, np.median, np.std...), so resamples are
+    evaluated a batch of rows at a time. ``method`` is 'percentile' or 'bca'; the BCa jackknife is O(n) for
+    means, variances and standard deviations. Returns (estimate, lower, upper).
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    estimate = statistic(values)
+    rng = _generator(seed)
+    boot = np.concatenate([statistic(values[resample_indices(len(values), size, rng)], axis=1)
+                           for size in _batches(n_boot, len(values))])[:, None]
+    jackknife = _jackknife(values, statistic)[:, None] if method == "bca" else None
+    lower, upper = _interval(boot, estimate, confidence, method, jackknife)
+    return estimate, lower[0], upper[0]
+
+
+def mean_cl_boot(series, n_samples=1000, confidence_interval=0.95, random_state=None, method="percentile"):
+    """Drop-in for plotnine's ``mean_cl_boot`` that remembers its results.
+
+    Pass it as ``stat_summary(fun_data=mean_cl_boot)``: the layers of a plot summarising the same groups (e.g.
+    points and lines) then get the same interval from a single bootstrap instead of resampling again.
+    """
+    values = np.asarray(series, dtype=float)
+    key = (hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest(), n_samples, confidence_interval, method)
+    if key not in _SUMMARIES:
+        mean, lower, upper = bootstrap_ci(values, np.mean, n_samples, confidence_interval, method, random_state)
+        _SUMMARIES[key] = pd.DataFrame({"ymin": [lower], "ymax": [upper], "y": [mean]})
+        while len(_SUMMARIES) > SUMMARY_CACHE_SIZE:
+            _SUMMARIES.popitem(last=False)
+    _SUMMARIES.move_to_end(key)
+    return _SUMMARIES[key].copy()
+
+
+def boot_summary(data, y, by, statistic=np.mean, n_boot=1000, confidence=0.95, method="percentile", seed=None,
+                 workers=None):
+    """Bootstrapped statistic with confidence interval for every group of ``data``, as one frame for plotting.
+
+    Groups are bootstrapped in parallel threads, each from its own stream spawned from ``seed``. The result has
+    the ``by`` columns plus y, ymin, ymax and n, ready to be given as ``data=`` to several layers, e.g.
+    geom_point, geom_line and geom_errorbar.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    groups = [(key, group[y].to_numpy(dtype=float)) for key, group in data.groupby(by, observed=True, sort=True)]
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+
+    def summarise(job):
+        (key, values), group_seed = job
+        estimate, lower, upper = bootstrap_ci(values, statistic, n_boot, confidence, method,
+                                              np.random.default_rng(group_seed))
+        return (*key, estimate, lower, upper, np.sum(~np.isnan(values)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(summarise, zip(groups, seeds)))
+    return pd.DataFrame(rows, columns=[*by, "y", "ymin", "ymax", "n"])
+
+
+# Function that returns Cohen's d from the means and variances of two samples, pooled as pingouin.compute_effsize does
+def _pooled_d(mean_x, var_x, nx, mean_y, var_y, ny):
+    pooled = ((nx - 1) * var_x + (ny - 1) * var_y) / (nx + ny - 2)
+    return (mean_x - mean_y) / np.sqrt(pooled)
+
+
+# Function that returns Cohen's d for every row of two matrices of samples
+def _cohen_d(x, y):
+    return _pooled_d(x.mean(axis=1), x.var(axis=1, ddof=1), x.shape[1], y.mean(axis=1), y.var(axis=1, ddof=1),
+                     y.shape[1])
+
+
+def cohen_d_ci(x, y, paired=False, n_boot=2000, confidence=0.95, method="bca", seed=None):
+    """Bootstrap confidence interval for Cohen's d between two samples.
+
+    Independent samples are resampled separately; paired samples are resampled as pairs. Returns
+    (d, lower, upper).
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    rng = _generator(seed)
+    if paired:
+        keep = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[keep], y[keep]
+        boot = []
+        for size in _batches(n_boot, 2 * len(x)):
+            index = resample_indices(len(x), size, rng)
+            boot.append(_cohen_d(x[index], y[index]))
+        # leave one pair out in turn
+        n = len(x)
+        jackknife = _pooled_d(*_loo_moments(x), n - 1, *_loo_moments(y), n - 1)
+    else:
+        x, y = x[~np.isnan(x)], y[~np.isnan(y)]
+        nx, ny = len(x), len(y)
+        boot = [_cohen_d(x[resample_indices(nx, size, rng)], y[resample_indices(ny, size, rng)])
+                for size in _batches(n_boot, nx + ny)]
+        # leave one observation out of either sample in turn
+        jackknife = np.concatenate([_pooled_d(*_loo_moments(x), nx - 1, y.mean(), y.var(ddof=1), ny),
+                                    _pooled_d(x.mean(), x.var(ddof=1), nx, *_loo_moments(y), ny - 1)])
+    boot = np.concatenate(boot)
+    estimate = _cohen_d(x[None, :], y[None, :])
+    lower, upper = _interval(boot[:, None], estimate, confidence, method, jackknife[:, None])
+    return estimate[0], lower[0], upper[0]
+
+
+def coef_ci(results, n_boot=2000, confidence=0.95, method="percentile", seed=None, batch_size=250):
+    """Case-resampling bootstrap confidence intervals for the coefficients of a fitted statsmodels OLS model.
+
+    Resamples are solved in batches from stacked Gram matrices (one einsum and one batched solve per batch);
+    resamples whose design is singular, e.g. a level of a factor drawn zero times, are left out. For 'bca' the
+    jackknife coefficients come from the leave-one-out update of the full fit rather than n refits.
+    """
+    exog, endog = results.model.exog, results.model.endog
+    n, k = exog.shape
+    rng = _generator(seed)
+    boot = []
+    for start in range(0, n_boot, batch_size):
+        index = resample_indices(n, min(batch_size, n_boot - start), rng)
+        x, y = exog[index], endog[index]
+        gram = np.einsum('bni,bnj->bij', x, x)
+        moment = np.einsum('bni,bn->bi', x, y)
+        singular = np.linalg.matrix_rank(gram) < k
+        gram[singular] = np.eye(k)
+        params = np.linalg.solve(gram, moment[..., None])[..., 0]
+        params[singular] = np.nan
+        boot.append(params)
+    boot = np.concatenate(boot)
+
+    jackknife = None
+    if method == "bca":
+        # beta_(i) = beta - (X'X)^-1 x_i e_i / (1 - h_i)
+        xtx_inv = np.linalg.pinv(exog.T @ exog)
+        leverage = np.einsum('ij,jk,ik->i', exog, xtx_inv, exog)
+        jackknife = results.params.to_numpy() - (exog @ xtx_inv) * (results.resid.to_numpy() / (1 - leverage))[:, None]
+
+    lower, upper = _interval(boot, results.params.to_numpy(), confidence, method, jackknife)
+    ci_name = "CI%.0f" % (100 * confidence)
+    return pd.DataFrame({"coef": results.params, f"{ci_name}_lower": lower, f"{ci_name}_upper": upper,
+                         "n_boot": np.sum(~np.isnan(boot), axis=0)}, index=results.params.index)
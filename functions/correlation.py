@@ -0,0 +1,119 @@
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+# Function that returns the numeric columns of a DataFrame (or a 2-D array) as a float matrix plus their names
+def _numeric_values(data):
+    if isinstance(data, pd.DataFrame):
+        numeric = data.select_dtypes('number')
+        return numeric.to_numpy(dtype=float), list(numeric.columns)
+    values = np.asarray(data, dtype=float)
+    return values, list(range(values.shape[1]))
+
+
+# Function that ranks every column (average ranks for ties, NaNs kept), one block of columns per thread
+def _ranks(values, block_size, pool):
+    width = values.shape[1]
+    blocks = [slice(start, min(start + block_size, width)) for start in range(0, width, block_size)]
+    ranked = pool.map(lambda block: stats.rankdata(values[:, block], axis=0, nan_policy='omit'), blocks)
+    return np.concatenate(list(ranked), axis=1)
+
+
+# Function that returns the correlations between two blocks of columns, accumulated over chunks of rows
+def _block_corr(values, means, first, second, chunk_rows, missing, min_periods):
+    shape = (first.stop - first.start, second.stop - second.start)
+    n, sum_a, sum_b, sq_a, sq_b, cross = (np.zeros(shape) for _ in range(6))
+    for start in range(0, values.shape[0], chunk_rows):
+        # centred on the column means, so the sums below do not cancel catastrophically
+        a = values[start:start + chunk_rows, first] - means[first]
+        b = values[start:start + chunk_rows, second] - means[second]
+        if missing:
+            # sums over the rows where both columns of a pair are present, as matrix products with the masks
+            present_a, present_b = (~np.isnan(a)).astype(float), (~np.isnan(b)).astype(float)
+            a, b = np.nan_to_num(a), np.nan_to_num(b)
+            n += present_a.T @ present_b
+            sum_a += a.T @ present_b
+            sum_b += present_a.T @ b
+            sq_a += (a * a).T @ present_b
+            sq_b += present_a.T @ (b * b)
+        else:
+            n += len(a)
+            sum_a += a.sum(axis=0)[:, None]
+            sum_b += b.sum(axis=0)[None, :]
+            sq_a += (a * a).sum(axis=0)[:, None]
+            sq_b += (b * b).sum(axis=0)[None, :]
+        cross += a.T @ b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (cross - sum_a * sum_b / n) / np.sqrt((sq_a - sum_a ** 2 / n) * (sq_b - sum_b ** 2 / n))
+    corr[n < max(min_periods, 2)] = np.nan
+    return np.clip(corr, -1, 1), n
+
+
+def _blocks(values, method, block_size, pool):
+    if method == 'spearman':
+        values = _ranks(values, block_size, pool)
+    elif method != 'pearson':
+        raise ValueError("method must be 'pearson' or 'spearman'")
+    width = values.shape[1]
+    blocks = [slice(start, min(start + block_size, width)) for start in range(0, width, block_size)]
+    pairs = [(first, second) for first in blocks for second in blocks if first.start <= second.start]
+    return values, pairs
+
+
+def correlation(data, method='pearson', min_periods=1, block_size=512, chunk_rows=65536, workers=None):
+    """Pearson or Spearman correlation matrix of the numeric columns, like ``DataFrame.corr(numeric_only=True)``.
+
+    The matrix is built from blocks of ``block_size`` x ``block_size`` columns, computed in parallel threads with
+    matrix products over ``chunk_rows`` rows at a time, so temporary memory does not grow with the table. Missing
+    values are handled pairwise. For Spearman, each column is ranked over all of its own non-missing values (as
+    pandas does when nothing is missing) rather than re-ranked for every pair.
+    """
+    values, names = _numeric_values(data)
+    missing = np.isnan(values).any()
+    result = np.empty((values.shape[1], values.shape[1]))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values, pairs = _blocks(values, method, block_size, pool)
+        means = np.nanmean(values, axis=0) if values.size else np.zeros(values.shape[1])
+
+        def fill(pair):
+            first, second = pair
+            corr, _ = _block_corr(values, means, first, second, chunk_rows, missing, min_periods)
+            result[first, second] = corr
+            result[second, first] = corr.T
+
+        list(pool.map(fill, pairs))
+    return pd.DataFrame(result, index=names, columns=names)
+
+
+def top_correlations(data, k=20, method='pearson', absolute=True, min_periods=1, block_size=512, chunk_rows=65536,
+                     workers=None):
+    """The ``k`` most strongly correlated pairs of numeric columns, without building the full matrix.
+
+    Each block of the matrix keeps only its own k best pairs, so memory is O(k) per block. Pairs are ranked by
+    absolute correlation (by signed correlation with ``absolute=False``) and returned with the number of rows
+    each correlation is based on.
+    """
+    values, names = _numeric_values(data)
+    missing = np.isnan(values).any()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values, pairs = _blocks(values, method, block_size, pool)
+        means = np.nanmean(values, axis=0) if values.size else np.zeros(values.shape[1])
+
+        def best(pair):
+            first, second = pair
+            corr, n = _block_corr(values, means, first, second, chunk_rows, missing, min_periods)
+            # each pair once: the upper triangle of the full matrix, without the diagonal
+            upper = np.arange(first.start, first.stop)[:, None] < np.arange(second.start, second.stop)[None, :]
+            rows, columns = np.nonzero(upper & ~np.isnan(corr))
+            score = np.abs(corr[rows, columns]) if absolute else corr[rows, columns]
+            top = np.argpartition(score, -k)[-k:] if len(score) > k else np.arange(len(score))
+            return [(score[i], rows[i] + first.start, columns[i] + second.start, corr[rows[i], columns[i]],
+                     n[rows[i], columns[i]]) for i in top]
+
+        candidates = heapq.nlargest(k, (item for block in pool.map(best, pairs) for item in block),
+                                    key=lambda item: item[0])
+    return pd.DataFrame([(names[i], names[j], corr, int(n)) for _, i, j, corr, n in candidates],
+                        columns=['var1', 'var2', 'r', 'n'])
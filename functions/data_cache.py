@@ -0,0 +1,97 @@
+import json
+import os
+import pandas as pd
+from ._cache import new_hash, hash_object
+from .tracing import traced
+
+# Name of the schema registry kept next to the cached tables
+REGISTRY_FILE = 'schemas.json'
+
+
+# Function that shrinks column dtypes: repetitive text columns become categoricals and integers are downcast
+def compact_dtypes(data, categorical_threshold=0.5, downcast_floats=False):
+    data = data.copy()
+    for column in data.columns:
+        series = data[column]
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique(dropna=True) <= categorical_threshold * max(len(series), 1):
+                data[column] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series):
+            data[column] = pd.to_numeric(series, downcast='integer')
+        elif downcast_floats and pd.api.types.is_float_dtype(series):
+            # off by default: float32 changes the numbers the models are fitted on
+            data[column] = pd.to_numeric(series, downcast='float')
+    return data
+
+
+def _read_registry(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, REGISTRY_FILE)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_registry(cache_dir, registry):
+    # replace the file in one step so concurrent loaders never read half a registry
+    path = os.path.join(cache_dir, REGISTRY_FILE)
+    partial = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(partial, 'w') as file:
+            json.dump(registry, file, indent=2, sort_keys=True)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+# Function that returns the schema recorded for a cached CSV file, or None if it has not been cached
+def cached_schema(path, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), '.cache')
+    return _read_registry(cache_dir).get(os.path.basename(path))
+
+
+# Function that loads a CSV through a memory-mapped Feather copy, rebuilding the copy when the CSV changes
+@traced('load_csv')
+def load_csv(path, columns=None, cache_dir=None, refresh=False, categorical_threshold=0.5, **read_csv_kwargs):
+    from pyarrow import feather
+
+    path = os.path.abspath(path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), '.cache')
+    name = os.path.basename(path)
+    table_path = os.path.join(cache_dir, os.path.splitext(name)[0] + '.feather')
+    source = os.stat(path)
+    # read_csv options can be types, tuples, callables...: entries are matched on a hash of them, and the registry
+    # only keeps a readable rendering
+    kwargs_key = hash_object(new_hash(), read_csv_kwargs).hexdigest()
+
+    entry = _read_registry(cache_dir).get(name)
+    fresh = (entry is not None
+             and entry['mtime_ns'] == source.st_mtime_ns
+             and entry['size'] == source.st_size
+             and entry.get('read_csv_key') == kwargs_key
+             and os.path.exists(table_path))
+    if fresh and not refresh:
+        return feather.read_table(table_path, columns=columns, memory_map=True).to_pandas()
+
+    data = compact_dtypes(pd.read_csv(path, **read_csv_kwargs), categorical_threshold)
+    os.makedirs(cache_dir, exist_ok=True)
+    partial = f'{table_path}.{os.getpid()}.tmp'
+    # uncompressed so the cached columns can be memory-mapped rather than decoded
+    feather.write_feather(data, partial, compression='uncompressed')
+    os.replace(partial, table_path)
+
+    registry = _read_registry(cache_dir)
+    registry[name] = {
+        'source': path,
+        'mtime_ns': source.st_mtime_ns,
+        'size': source.st_size,
+        'read_csv_key': kwargs_key,
+        'read_csv_kwargs': {key: repr(value) for key, value in read_csv_kwargs.items()},
+        'rows': len(data),
+        'dtypes': {column: str(dtype) for column, dtype in data.dtypes.items()},
+        'categories': {column: len(data[column].cat.categories)
+                       for column in data.columns if isinstance(data[column].dtype, pd.CategoricalDtype)},
+    }
+    _write_registry(cache_dir, registry)
+    return data[columns] if columns is not None else data
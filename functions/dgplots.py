@@ -1,74 +1,288 @@
 from typing import Type
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import functools
+import importlib.util
+import os
+import sys
+import types
 import pandas as pd
 import numpy as np
 import statsmodels.api as sm
 import statsmodels.formula.api as smf
 from plotnine import *
-import patchworklib as pw
+from .diagnostics import ols_diagnostics, Diagnostics
+from .fit_cache import CachedFit
+from . import quantile_sketch, smoothers
+from .quantile_sketch import qq_plot
+from .smoothers import binned_smooth
+from .render_cache import default_cache, force_render, renderer_versions
+from .render_profiles import render_settings
+from ._cache import new_hash, hash_arrays, hash_object
+from .tracing import span, traced
 
 
-def dgplots(dir_path, file_name_header, results: Type[sm.regression.linear_model.RegressionResultsWrapper]) -> None:
-    if isinstance(results, sm.regression.linear_model.RegressionResultsWrapper) is False:
+# Number of observations above which the scatter panels switch to a binned density grid
+BIN_THRESHOLD = 100_000
+
+
+# Function that bins two columns into a 2-D histogram and returns the occupied cells as a small frame
+def _density_grid(x, y, bins):
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    x_idx, y_idx = np.nonzero(counts)
+    grid = pd.DataFrame({
+        "x": (x_edges[x_idx] + x_edges[x_idx + 1]) / 2,
+        "y": (y_edges[y_idx] + y_edges[y_idx + 1]) / 2,
+        "count": counts[x_idx, y_idx],
+    })
+    return grid, x_edges[1] - x_edges[0], y_edges[1] - y_edges[0]
+
+
+# Function that picks the rows drawn individually in binned mode: points past the 4/n cook's threshold, at most top_k
+def _highlighted(model_values, top_k):
+    cooks_d = model_values["cooks_d"].to_numpy()
+    idx = np.flatnonzero(cooks_d > 4 / len(cooks_d))
+    if len(idx) > top_k:
+        idx = idx[np.argpartition(cooks_d[idx], -top_k)[-top_k:]]
+    return model_values.iloc[np.sort(idx)]
+
+
+def _scatter_layers(model_values, y, aggregate, bins, top_k):
+    if not aggregate:
+        return [geom_point()]
+    grid, width, height = _density_grid(model_values["predicted_values"], model_values[y], bins)
+    return [
+        geom_tile(aes(x="x", y="y", fill="count"), data=grid, width=width, height=height, inherit_aes=False),
+        scale_fill_gradient(low="#d9d9d9", high="#000000", trans="log10"),
+        geom_point(data=_highlighted(model_values, top_k), colour="darkorange", size=1),
+    ]
+
+
+# Function that returns the red trend line: plotnine's geom_smooth, or a precomputed binned smoother
+def _smooth_layer(model_values, y, smoother):
+    if smoother == "binned":
+        trend = binned_smooth(model_values["predicted_values"], model_values[y])
+        return geom_line(aes(x="x", y="y"), data=trend, colour="red", inherit_aes=False)
+    return geom_smooth(se=False, colour="red")
+
+
+def _residuals_plot(model_values, aggregate=False, bins=200, top_k=1000, smoother="loess"):
+    plot = ggplot(model_values, aes(x="predicted_values", y="residuals"))
+    for layer in _scatter_layers(model_values, "residuals", aggregate, bins, top_k):
+        plot += layer
+    return (
+            plot
+            + _smooth_layer(model_values, "residuals", smoother)
+            + labs(title="Residuals plot")
+            + xlab("predicted values")
+            + ylab("residuals")
+            + theme_bw()
+    )
+
+
+def _qq_plot(model_values, aggregate=False, **options):
+    # in binned mode the residuals go through a quantile sketch and a fixed number of quantiles is drawn
+    return (
+            qq_plot(model_values["residuals"], sketch_threshold=0 if aggregate else np.inf)
+            + labs(title="Q-Q plot")
+            + xlab("theoretical quantiles")
+            + ylab("sample quantiles")
+            + theme_bw()
+    )
+
+
+def _location_scale_plot(model_values, aggregate=False, bins=200, top_k=1000, smoother="loess"):
+    plot = ggplot(model_values, aes(x="predicted_values", y="std_resid"))
+    for layer in _scatter_layers(model_values, "std_resid", aggregate, bins, top_k):
+        plot += layer
+    return (
+            plot
+            + _smooth_layer(model_values, "std_resid", smoother)
+            + labs(title="Location-Scale plot")
+            + xlab("predicted values")
+            + ylab(u"\u221A"'|standardised residuals|')
+            + theme_bw()
+    )
+
+
+def _influential_points_plot(model_values, aggregate=False, bins=200, top_k=1000, **options):
+    n_obs = len(model_values.index)
+    if aggregate:
+        # draw the per-bin maximum of cook's d as an envelope, plus the highlighted points themselves
+        starts = np.linspace(0, n_obs, min(bins, n_obs) + 1).astype(int)[:-1]
+        envelope = pd.DataFrame({
+            "obs": (starts + np.append(starts[1:], n_obs) - 1) / 2,
+            "cooks_d": np.maximum.reduceat(model_values["cooks_d"].to_numpy(), starts),
+        })
+        points = _highlighted(model_values, top_k)
+        layers = [
+            geom_segment(aes(xend="obs", yend=0), data=envelope, colour="lightblue"),
+            geom_point(data=points),
+            geom_segment(aes(xend="obs", yend=0), data=points, colour="blue"),
+        ]
+    else:
+        layers = [geom_point(), geom_segment(aes(xend="obs", yend=0), colour="blue")]
+    plot = ggplot(model_values, aes(x="obs", y="cooks_d"))
+    for layer in layers:
+        plot += layer
+    return (
+            plot
+            + geom_hline(yintercept=0)
+            + geom_hline(yintercept=4 / n_obs, colour="blue", linetype="dashed")
+            + labs(title="Influential points")
+            + xlab("observation")
+            + ylab('cook\'s d')
+            + theme_bw()
+    )
+
+
+# The four diagnostic panels, keyed by the suffix of their output file
+PANELS = {
+    'residuals_plot': _residuals_plot,
+    'QQ_plot': _qq_plot,
+    'location_scale_plot': _location_scale_plot,
+    'influential_points_plot': _influential_points_plot,
+}
+
+# Suffix of the single file written in composite mode, holding all four panels
+COMPOSITE = 'diagnostics'
+
+# Inches per unit of the width and height in the render settings
+_INCHES = {'in': 1, 'cm': 1 / 2.54, 'mm': 1 / 25.4}
+
+
+def _render_panel(panel, model_values, filename, options, settings):
+    with span('dgplots.panel', panel=panel):
+        PANELS[panel](model_values, **options).save(filename=filename, **settings)
+
+
+# Function that lays the four panels out in a 2x2 grid and saves them as one figure, in one encoder pass
+def _render_composite(model_values, filename, options, settings):
+    plots = [builder(model_values, **options) for builder in PANELS.values()]
+    dpi = settings.get('dpi')
+    # each panel keeps the size it has as a separate file, so the grid is twice as wide and twice as tall
+    size = None
+    if settings.get('width') and settings.get('height'):
+        units = settings.get('units', 'in')
+        scale = 1 / dpi if units == 'px' else _INCHES[units]
+        size = (2 * settings['width'] * scale, 2 * settings['height'] * scale)
+    # plotnine >= 0.15 composes plots with | and /; patchworklib is only needed (and only imported) for older releases
+    if importlib.util.find_spec('plotnine.composition') is None:
+        import patchworklib as pw
+        bricks = [pw.load_ggplot(plot, figsize=(size[0] / 2, size[1] / 2) if size else None) for plot in plots]
+        ((bricks[0] | bricks[1]) / (bricks[2] | bricks[3])).savefig(filename, dpi=dpi)
+        return
+    composite = (plots[0] | plots[1]) / (plots[2] | plots[3])
+    if size:
+        composite += theme(figure_size=size)
+    composite.save(filename, dpi=dpi)
+
+
+# Function that hashes the code of every function and method in the modules that draw the panels (the builders and
+# the helpers they call: _scatter_layers, qq_plot, binned_smooth...) and the plotting library versions, once
+@functools.lru_cache(maxsize=None)
+def _renderer_hash():
+    h = new_hash()
+    hash_object(h, renderer_versions())
+    for module in (sys.modules[__name__], quantile_sketch, smoothers):
+        for name, value in sorted(vars(module).items()):
+            if getattr(value, '__module__', None) != module.__name__:
+                continue
+            if isinstance(value, type):
+                hash_object(h, [name, [item for _, item in sorted(vars(value).items())
+                                       if isinstance(item, types.FunctionType)]])
+            elif isinstance(value, types.FunctionType):
+                hash_object(h, [name, value])
+    return h.hexdigest()
+
+
+# Function that gives each panel (and the composite figure) a cache key built from the diagnostic values, the panel
+# and rendering code and its options
+def _panel_keys(diagnostics, options, settings):
+    data_hash = hash_arrays(new_hash(), *diagnostics).hexdigest()
+    code_hash = _renderer_hash()
+    keys = {panel: hash_object(new_hash(), [data_hash, code_hash, panel, options, settings]).hexdigest()
+            for panel in PANELS}
+    keys[COMPOSITE] = hash_object(new_hash(), [data_hash, code_hash, COMPOSITE, options, settings]).hexdigest()
+    return keys
+
+
+# Worker entry point: rebuild the plotting frame from the parent's shared memory block and render one panel
+def _render_shared_panel(shm_name, n_obs, panel, filename, options, settings):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arrays = np.ndarray((len(Diagnostics._fields), n_obs), dtype=float, buffer=shm.buf)
+        model_values = Diagnostics(*arrays).to_frame()
+        del arrays
+        _render_panel(panel, model_values, filename, options, settings)
+    finally:
+        shm.close()
+
+
+def _render_parallel(diagnostics, filenames, options, settings, workers):
+    # Copy the diagnostic arrays into shared memory once; workers attach to it by name instead of unpickling a frame
+    shm = shared_memory.SharedMemory(create=True, size=len(diagnostics) * diagnostics.n_obs * 8)
+    try:
+        arrays = np.ndarray((len(diagnostics), diagnostics.n_obs), dtype=float, buffer=shm.buf)
+        arrays[:] = diagnostics
+        del arrays
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_render_shared_panel, shm.name, diagnostics.n_obs, panel, filename, options,
+                                       settings)
+                       for panel, filename in filenames.items()]
+            for future in futures:
+                future.result()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@traced('dgplots')
+def dgplots(dir_path, file_name_header, results: Type[sm.regression.linear_model.RegressionResultsWrapper],
+            parallel=False, workers=None, bin_threshold=BIN_THRESHOLD, bins=200, top_k=1000,
+            smoother=None, cache=True, force=False, profile=None, composite=False) -> None:
+    if isinstance(results, (CachedFit, sm.regression.linear_model.RegressionResultsWrapper)) is False:
         raise TypeError("Please provide a model fit.")
     else:
 
-        residuals = results.resid.rename("residuals")
-        predicted_values = results.fittedvalues.rename("predicted_values")
-        std_resid = pd.Series(np.sqrt(np.abs(results.get_influence().resid_studentized_internal))).rename("std_resid")
-        influence = results.get_influence()
-        cooks_d = pd.Series(influence.cooks_distance[0]).rename("cooks_d")
-        leverage = pd.Series(influence.hat_matrix_diag).rename("leverage")
-        obs = pd.Series(range(len(residuals))).rename("obs")
-        n_obs = len(obs.index)
-
-        # combine Series into DataFrame
-        model_values = residuals.to_frame().join(predicted_values).join(std_resid).join(cooks_d).join(leverage).join(
-            obs)
-        # add the total number of observations
-        model_values["n_obs"] = n_obs
-
-        p1 = (
-                ggplot(model_values, aes(x="predicted_values", y="residuals"))
-                + geom_point()
-                + geom_smooth(se=False, colour="red")
-                + labs(title="Residuals plot")
-                + xlab("predicted values")
-                + ylab("residuals")
-                + theme_bw()
-        )
-        p1.save(filename=f'{dir_path}{file_name_header}-residuals_plot.png', height=15, width=20, units='cm', dpi=600)
-
-        p2 = (
-                ggplot(model_values, aes(sample="residuals"))
-                + stat_qq()
-                + stat_qq_line(colour="blue")
-                + labs(title="Q-Q plot")
-                + xlab("theoretical quantiles")
-                + ylab("sample quantiles")
-                + theme_bw()
-        )
-        p2.save(filename=f'{dir_path}{file_name_header}-QQ_plot.png', height=15, width=20, units='cm', dpi=600)
-
-        p3 = (
-                ggplot(model_values, aes(x="predicted_values", y="std_resid"))
-                + geom_point()
-                + geom_smooth(se=False, colour="red")
-                + labs(title="Location-Scale plot")
-                + xlab("predicted values")
-                + ylab(u"\u221A"'|standardised residuals|')
-                + theme_bw()
-        )
-        p3.save(filename=f'{dir_path}{file_name_header}-location_scale_plot.png', height=15, width=20, units='cm', dpi=600)
-
-        p4 = (
-                ggplot(model_values, aes(x="obs", y="cooks_d"))
-                + geom_point()
-                + geom_segment(aes(xend="obs", yend=0), colour="blue")
-                + geom_hline(aes(yintercept=0))
-                + geom_hline(aes(yintercept=4 / n_obs), colour="blue", linetype="dashed")
-                + labs(title="Influential points")
-                + xlab("observation")
-                + ylab('cook\'s d')
-                + theme_bw()
-        )
-        p4.save(filename=f'{dir_path}{file_name_header}-influential_points_plot.png', height=15, width=20, units='cm', dpi=600)
+        # residuals, leverage, studentized residuals and cook's d from a single factorization; a cached fit has
+        # them stored with it
+        diagnostics = results.diagnostics if isinstance(results, CachedFit) else ols_diagnostics(results)
+        # composite mode writes a single 2x2 figure instead of one file per panel
+        panels = [COMPOSITE] if composite else PANELS
+        filenames = {panel: f'{dir_path}{file_name_header}-{panel}.png' for panel in panels}
+        # above the threshold, bin the scatter panels and only draw influential points individually
+        aggregate = diagnostics.n_obs > bin_threshold
+        # the binned smoother replaces LOESS by default whenever the panels are binned
+        if smoother is None:
+            smoother = "binned" if aggregate else "loess"
+        options = dict(aggregate=aggregate, bins=bins, top_k=top_k, smoother=smoother)
+        settings = render_settings(profile)
+
+        # panels whose diagnostics and settings match an earlier render are copied from the cache instead
+        if cache:
+            with span('dgplots.cache_fetch'):
+                keys = _panel_keys(diagnostics, options, settings)
+                if not (force or force_render()):
+                    filenames = {panel: filename for panel, filename in filenames.items()
+                                 if not default_cache.fetch(keys[panel], filename)}
+            if not filenames:
+                return
+
+        if composite:
+            with span('dgplots.composite'):
+                _render_composite(diagnostics.to_frame(), filenames[COMPOSITE], options, settings)
+        elif parallel:
+            # render all four panels at the same time, one process each; spans inside the workers are not recorded
+            workers = min(len(filenames), workers or os.cpu_count() or 1)
+            with span('dgplots.render_parallel', workers=workers):
+                _render_parallel(diagnostics, filenames, options, settings, workers)
+        else:
+            model_values = diagnostics.to_frame()
+            for panel, filename in filenames.items():
+                _render_panel(panel, model_values, filename, options, settings)
+
+        if cache:
+            with span('dgplots.cache_store'):
+                for panel, filename in filenames.items():
+                    default_cache.store(keys[panel], filename)
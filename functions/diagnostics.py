@@ -0,0 +1,77 @@
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_factor, solve_triangular
+from .tracing import traced
+
+# Number of rows handled per block when streaming through the design matrix
+CHUNK_ROWS = 65536
+
+
+class Diagnostics(NamedTuple):
+    """Per-observation regression diagnostics held as plain NumPy arrays."""
+    residuals: np.ndarray
+    fitted: np.ndarray
+    leverage: np.ndarray
+    studentized: np.ndarray
+    cooks_d: np.ndarray
+
+    @property
+    def n_obs(self):
+        return len(self.residuals)
+
+    def to_frame(self):
+        # Build the plotting frame in one go rather than joining Series together
+        return pd.DataFrame({
+            "residuals": self.residuals,
+            "predicted_values": self.fitted,
+            "std_resid": np.sqrt(np.abs(self.studentized)),
+            "cooks_d": self.cooks_d,
+            "leverage": self.leverage,
+            "obs": np.arange(self.n_obs),
+            "n_obs": self.n_obs,
+        })
+
+
+# Function that returns a matrix W with X'X = (W^-1)'(W^-1), so the hat diagonal is the row norm of X @ W
+def _whitening_factor(gram):
+    tol = np.abs(gram).max() * len(gram) * np.finfo(float).eps
+    try:
+        chol, _ = cho_factor(gram, lower=True)
+        if np.square(np.diag(chol)).min() > tol:
+            return solve_triangular(chol, np.eye(len(gram)), lower=True).T
+    except np.linalg.LinAlgError:
+        pass
+    # Rank deficient design: fall back to the pseudo-inverse square root, as pinv does
+    eigval, eigvec = np.linalg.eigh(gram)
+    keep = eigval > tol
+    return eigvec[:, keep] / np.sqrt(eigval[keep])
+
+
+# Function that computes residuals, leverage, studentized residuals and Cook's distance for an OLS fit
+@traced('ols_diagnostics')
+def ols_diagnostics(results, chunk_rows=CHUNK_ROWS) -> Diagnostics:
+    model = results.model
+    exog = np.asarray(model.exog, dtype=float)
+    endog = np.asarray(model.endog, dtype=float)
+    params = np.asarray(results.params, dtype=float)
+    n_obs, k_vars = exog.shape
+
+    # One p x p factorization of the Gram matrix serves every block of rows
+    whiten = _whitening_factor(exog.T @ exog)
+
+    residuals = np.empty(n_obs)
+    fitted = np.empty(n_obs)
+    leverage = np.empty(n_obs)
+    for start in range(0, n_obs, chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        np.dot(exog[rows], params, out=fitted[rows])
+        np.subtract(endog[rows], fitted[rows], out=residuals[rows])
+        leverage[rows] = np.square(exog[rows] @ whiten).sum(axis=1)
+
+    # Internally studentized residuals and Cook's distance, as in statsmodels' OLSInfluence
+    one_minus_h = 1.0 - leverage
+    studentized = residuals / np.sqrt(results.scale * one_minus_h)
+    cooks_d = np.square(studentized) * leverage / one_minus_h / k_vars
+
+    return Diagnostics(residuals, fitted, leverage, studentized, cooks_d)
@@ -0,0 +1,192 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import patsy
+import statsmodels
+import statsmodels.formula.api as smf
+from statsmodels.regression.linear_model import OLSResults, RegressionResultsWrapper
+from ._cache import new_hash, hash_object, hash_frame, prune_directory, touch
+from .diagnostics import ols_diagnostics, Diagnostics
+from .streaming_ols import formula_columns
+from .tracing import span
+
+# Fitted models are kept here, named by the hash of the formula, data and options that produced them
+DEFAULT_CACHE_DIR = os.environ.get('FUNCTIONS_FIT_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'functions', 'fits'))
+DEFAULT_MAX_BYTES = 1024 ** 3
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+# Version of the layout of a stored entry; part of the key, so entries written by another version are not read
+ENTRY_FORMAT = 2
+
+# Summary statistics stored with every fit, so a cached result can answer them without the data
+_STATISTICS = ('nobs', 'df_model', 'df_resid', 'ssr', 'ess', 'centered_tss', 'scale', 'rsquared', 'rsquared_adj',
+               'fvalue', 'f_pvalue', 'llf', 'aic', 'bic', 'condition_number')
+
+
+# Function that says whether the environment asks for every model to be refitted (FUNCTIONS_FORCE_FIT=1)
+def force_fit():
+    return os.environ.get('FUNCTIONS_FORCE_FIT', '').lower() in ('1', 'true', 'yes')
+
+
+# Function that hashes a formula, the data columns it uses and the model and fit options
+def fit_key(formula, data, model_kwargs=None, fit_kwargs=None):
+    columns, _ = formula_columns(formula, data.columns)
+    h = new_hash()
+    hash_object(h, [ENTRY_FORMAT, formula, columns, model_kwargs or {}, fit_kwargs or {}])
+    hash_object(h, [statsmodels.__version__, patsy.__version__, np.__version__, pd.__version__])
+    hash_frame(h, data[columns])
+    return h.hexdigest()
+
+
+class CachedFit:
+    """Results of an OLS fit read back from the fit cache.
+
+    Coefficient tables (params, bse, tvalues, pvalues, conf_int(), cov_params()), the statistics in
+    ``_STATISTICS`` and the per-observation diagnostics (resid, fittedvalues and ``diagnostics``: leverage,
+    studentized residuals, Cook's distance) come straight from the cache, so dgplots needs neither the data nor
+    a refit. Anything else (summary(), get_influence(), outlier_test(), use in anova_lm...) is handed to a full
+    OLSResults, rebuilt on first use from the stored coefficients and covariance - the design matrix is rebuilt,
+    but the model is not refitted.
+    """
+
+    def __init__(self, entry, formula, data, model_kwargs):
+        self._entry = entry
+        self._formula, self._data, self._model_kwargs = formula, data, model_kwargs
+        self._results = None
+        names = entry['names']
+        self.params = pd.Series(entry['params'], index=names)
+        self.bse = pd.Series(entry['bse'], index=names)
+        self.tvalues = pd.Series(entry['tvalues'], index=names)
+        self.pvalues = pd.Series(entry['pvalues'], index=names)
+        self.__dict__.update(entry['statistics'])
+        self.diagnostics = Diagnostics(**entry['diagnostics'])
+        self.resid = pd.Series(self.diagnostics.residuals, index=entry['row_labels'])
+        self.fittedvalues = pd.Series(self.diagnostics.fitted, index=entry['row_labels'])
+
+    def cov_params(self):
+        names = self._entry['names']
+        return pd.DataFrame(self._entry['cov_params'], index=names, columns=names)
+
+    def conf_int(self, alpha=0.05):
+        if alpha == 0.05:
+            return pd.DataFrame(self._entry['conf_int'], index=self._entry['names'])
+        return self.results.conf_int(alpha)
+
+    @property
+    def results(self):
+        if self._results is None:
+            entry = self._entry
+            model = smf.ols(self._formula, data=self._data, **self._model_kwargs)
+            # known already, so statsmodels does not take an SVD of the n-row design to find it
+            model.rank = entry['rank']
+            # the pseudo-inverse fit() would have left on the model, read by sandwich covariances and
+            # get_influence(): (X'X)^+ X', from the stored covariance rather than an SVD of the design
+            model.pinv_wexog = entry['normalized_cov_params'] @ model.wexog.T
+            results = OLSResults(model, entry['params'], normalized_cov_params=entry['normalized_cov_params'],
+                                 scale=entry['scale'], cov_type=entry['cov_type'], cov_kwds=entry['cov_kwds'],
+                                 use_t=entry['use_t'])
+            self._results = RegressionResultsWrapper(results)
+        return self._results
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_entry', '_results', 'results'):
+            raise AttributeError(name)
+        return getattr(self.results, name)
+
+
+# Function that reduces fitted results to the arrays and numbers kept in the cache
+def _entry(results, fit_kwargs):
+    entry = {
+        'names': list(results.params.index),
+        'params': results.params.to_numpy(),
+        'bse': results.bse.to_numpy(),
+        'tvalues': results.tvalues.to_numpy(),
+        'pvalues': results.pvalues.to_numpy(),
+        'conf_int': results.conf_int().to_numpy(),
+        'cov_params': results.cov_params().to_numpy(),
+        'normalized_cov_params': np.asarray(results.normalized_cov_params),
+        'scale': results.scale,
+        'rank': results.model.rank,
+        'cov_type': results.cov_type,
+        'cov_kwds': fit_kwargs.get('cov_kwds'),
+        'use_t': results.use_t,
+        'statistics': {name: getattr(results, name) for name in _STATISTICS},
+        'diagnostics': ols_diagnostics(results)._asdict(),
+        'row_labels': results.model.data.row_labels,
+    }
+    return entry
+
+
+class FitCache:
+    """Fitted models and their diagnostics on disk, keyed by fit_key(), evicting entries past max_age or max_bytes
+    (LRU)."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.pkl')
+
+    def fetch(self, key):
+        # the stored entry for key, or None if there is none
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        touch(path)
+        return entry
+
+    def store(self, key, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        # write under a temporary name first so concurrent readers never see a partial file
+        partial = f'{path}.{os.getpid()}.tmp'
+        with open(partial, 'wb') as file:
+            pickle.dump(entry, file)
+        os.replace(partial, path)
+        self.prune()
+
+    def prune(self):
+        if os.path.isdir(self.directory):
+            prune_directory(self.directory, max_bytes=self.max_bytes, max_age=self.max_age)
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            prune_directory(self.directory, max_bytes=0)
+
+
+default_cache = FitCache()
+
+
+def cached_ols(formula, data, fit_kwargs=None, cache=True, force=False, **model_kwargs):
+    """``smf.ols(formula, data, **model_kwargs).fit(**fit_kwargs)``, memoised on disk.
+
+    The cache key covers the formula, the contents of the columns it uses, the model and fit options and the
+    library versions. A fresh fit returns the usual statsmodels results; a cache hit returns a CachedFit. Pass
+    ``cache=False`` to skip the cache, a FitCache to use another directory, and ``force=True`` (or set
+    FUNCTIONS_FORCE_FIT=1) to refit and overwrite the stored entry.
+    """
+    fit_kwargs = fit_kwargs or {}
+    with span('cached_ols', formula=formula):
+        if cache is False:
+            with span('cached_ols.fit'):
+                return smf.ols(formula, data=data, **model_kwargs).fit(**fit_kwargs)
+        cache = default_cache if cache is True else cache
+        with span('cached_ols.key'):
+            key = fit_key(formula, data, model_kwargs, fit_kwargs)
+        if not (force or force_fit()):
+            with span('cached_ols.fetch'):
+                entry = cache.fetch(key)
+            if entry is not None:
+                return CachedFit(entry, formula, data, model_kwargs)
+        with span('cached_ols.fit'):
+            results = smf.ols(formula, data=data, **model_kwargs).fit(**fit_kwargs)
+        with span('cached_ols.store'):
+            cache.store(key, _entry(results, fit_kwargs))
+        return results
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+import patsy
+import statsmodels.api as sm
+from scipy import stats
+from statsmodels.regression.linear_model import OLSResults, RegressionResultsWrapper
+
+
+# Function that regresses the last column of a triangular factor of [X y] on some of its other columns
+def _lstsq_factor(r, columns):
+    # ||R z|| equals ||[X y] z|| for every z, so this is the least-squares fit on the data itself
+    params, _, rank, _ = np.linalg.lstsq(r[:, columns], r[:, -1], rcond=None)
+    residual = r[:, -1] - r[:, columns] @ params
+    return params, residual @ residual, rank
+
+
+# Function that returns the sets of factors of a design's terms, used to match and nest terms
+def _factor_sets(design_info):
+    return [frozenset(term.factors) for term in design_info.terms]
+
+
+def anova_from_factor(r, design_info, nobs, typ=1):
+    """ANOVA table (types I, II and III) from the triangular factor R of the augmented design [X y].
+
+    Every sum of squares is the difference between the residual sums of squares of two nested submodels, each
+    found from R alone (a least-squares problem with p + 1 rows) rather than by refitting n rows. The table has
+    the layout and values of ``statsmodels.stats.anova.anova_lm`` for the same model.
+    """
+    names = design_info.term_names
+    slices = [design_info.term_name_slices[name] for name in names]
+    factor_sets = _factor_sets(design_info)
+    n_columns = r.shape[1] - 1
+    _, ssr, rank = _lstsq_factor(r, np.arange(n_columns))
+    df_resid = nobs - rank
+    scale = ssr / df_resid
+
+    def dropped_ss(drop, keep_out=()):
+        # extra sum of squares for the columns in drop, on top of all columns except drop and keep_out
+        others = [column for column in range(n_columns) if column not in set(keep_out)]
+        base = [column for column in others if column not in set(drop)]
+        return _lstsq_factor(r, base)[1] - _lstsq_factor(r, others)[1]
+
+    if typ in (1, "I"):
+        # sequential sums of squares are the squared effects Q'y of the design columns in order
+        effects = r[:n_columns, -1]
+        rows = [(name, s.stop - s.start, np.sum(effects[s] ** 2)) for name, s in zip(names, slices)
+                if name != "Intercept"]
+        table = pd.DataFrame(rows, columns=["term", "df", "sum_sq"]).set_index("term")
+        table.loc["Residual"] = [df_resid, ssr]
+        table["df"] = table["df"].astype(float)
+        table["mean_sq"] = table["sum_sq"] / table["df"]
+        table["F"] = table["mean_sq"] / scale
+        table["PR(>F)"] = stats.f.sf(table["F"], table["df"], df_resid)
+        table.loc["Residual", ["F", "PR(>F)"]] = np.nan
+        table = table[["df", "sum_sq", "mean_sq", "F", "PR(>F)"]]
+    elif typ in (2, "II", 3, "III"):
+        rows = []
+        for name, s, factors in zip(names, slices, factor_sets):
+            if typ in (2, "II"):
+                if name == "Intercept":
+                    continue
+                # adjusted for everything except the higher-order terms containing this term
+                containing = [column for other, other_slice in zip(factor_sets, slices)
+                              if factors < other for column in range(other_slice.start, other_slice.stop)]
+                sum_sq = dropped_ss(range(s.start, s.stop), containing)
+            else:
+                sum_sq = dropped_ss(range(s.start, s.stop))
+            rows.append((name, sum_sq, float(s.stop - s.start)))
+        table = pd.DataFrame(rows, columns=["term", "sum_sq", "df"]).set_index("term")
+        table["F"] = table["sum_sq"] / table["df"] / scale
+        table["PR(>F)"] = stats.f.sf(table["F"], table["df"], df_resid)
+        table.loc["Residual"] = [ssr, df_resid, np.nan, np.nan]
+    else:
+        raise ValueError(f"Type {typ} not understood")
+    table.index.name = None
+    return table
+
+
+class NestedModels:
+    """A model formula and all of its nested submodels, fitted from one factorization of the full design.
+
+    The design matrix is built once and [X y] is reduced to its triangular QR factor R ((p + 1) x (p + 1)).
+    Any submodel - a subset of the formula's terms - is then a least-squares problem on columns of R, so model
+    comparisons and type I/II/III ANOVA tables never rebuild the design or refit the n rows.
+
+    Example::
+
+        models = NestedModels('light ~ depth * C(species)', treelight)
+        interaction = models.fit()
+        additive = models.fit('depth + C(species)')
+        models.anova(typ=2)
+        models.anova(typ=2, terms='depth + C(species)')
+        models.compare('depth + C(species)', 'depth * C(species)')
+    """
+
+    def __init__(self, formula, data):
+        self.formula = formula
+        self.endog, self.exog = patsy.dmatrices(formula, data, return_type='dataframe')
+        self.design_info = self.exog.design_info
+        self.nobs = len(self.endog)
+        self._r = np.linalg.qr(np.column_stack([self.exog.to_numpy(), self.endog.to_numpy()]), mode='r')
+
+    @property
+    def terms(self):
+        return self.design_info.term_names
+
+    def _term_names(self, terms):
+        # names of the terms in a term list or a right-hand-side formula, in design order; None means every term
+        if terms is None:
+            return list(self.terms)
+        if isinstance(terms, str):
+            wanted = {frozenset(term.factors) for term in patsy.ModelDesc.from_formula(terms).rhs_termlist}
+        else:
+            wanted = {frozenset(self.design_info.terms[self.terms.index(name)].factors) for name in terms}
+        known = _factor_sets(self.design_info)
+        if not wanted <= set(known):
+            raise ValueError(f"Submodel terms must be among the terms of '{self.formula}'.")
+        return [name for name, factors in zip(self.terms, known) if factors in wanted]
+
+    def _columns(self, terms):
+        # columns of the design belonging to the submodel's terms
+        slices = [self.design_info.term_name_slices[name] for name in self._term_names(terms)]
+        return np.concatenate([np.arange(s.start, s.stop) for s in slices])
+
+    def ssr(self, terms=None):
+        # residual sum of squares and residual degrees of freedom of a submodel
+        _, ssr, rank = _lstsq_factor(self._r, self._columns(terms))
+        return ssr, self.nobs - rank
+
+    def fit(self, terms=None):
+        """statsmodels results for a submodel (the full model by default), without refitting the data.
+
+        ``terms`` is a right-hand-side formula such as ``'depth + C(species)'`` or a list of term names.
+        """
+        columns = self._columns(terms)
+        params, _, rank = _lstsq_factor(self._r, columns)
+        # (X'X)^+ from the factor: pinv(R_S) pinv(R_S)'
+        r_inverse = np.linalg.pinv(self._r[:, columns])
+        model = sm.OLS(self.endog, self.exog.iloc[:, columns])
+        # known already, so statsmodels does not take an SVD of the n-row design to find it
+        model.rank = rank
+        # the formula metadata smf.ols() would have attached, so anova_lm and friends accept the results
+        names = self._term_names(terms)
+        rhs = [name for name in names if name != 'Intercept'] or ['1']
+        model.formula = model.data.formula = (f"{self.endog.columns[0]} ~ {' + '.join(rhs)}"
+                                              + ('' if 'Intercept' in names else ' - 1'))
+        model.data.model_spec = self.design_info.subset(names)
+        normalized_cov_params = r_inverse @ r_inverse.T
+        # the pseudo-inverse fit() would have left on the model, which get_influence() reads: (X'X)^+ X'
+        model.pinv_wexog = normalized_cov_params @ model.wexog.T
+        # OLSResults, as OLS.fit() builds, so get_influence(), outlier_test() etc. are there too
+        results = OLSResults(model, params, normalized_cov_params=normalized_cov_params)
+        # wrapped like the output of fit(), so params, resid etc. come back as labelled pandas objects
+        return RegressionResultsWrapper(results)
+
+    def anova(self, typ=1, terms=None):
+        # ANOVA table of the full model, or of the submodel made of ``terms``
+        if terms is None:
+            return anova_from_factor(self._r, self.design_info, self.nobs, typ)
+        names = self._term_names(terms)
+        # the submodel's columns and y, re-triangularised: a (p + 1)-row QR, not a pass over the data
+        r = np.linalg.qr(self._r[:, np.r_[self._columns(names), self._r.shape[1] - 1]], mode='r')
+        return anova_from_factor(r, self.design_info.subset(names), self.nobs, typ)
+
+    def compare(self, *submodels):
+        """F-tests between increasingly large submodels, laid out like ``anova_lm(model_1, model_2, ...)``."""
+        ssr, df_resid = np.array([self.ssr(terms) for terms in submodels]).T
+        scale = ssr[-1] / df_resid[-1]
+        df_diff = np.r_[0, -np.diff(df_resid)]
+        ss_diff = np.r_[np.nan, -np.diff(ssr)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fvalue = ss_diff / df_diff / scale
+        return pd.DataFrame({
+            'df_resid': df_resid,
+            'ssr': ssr,
+            'df_diff': df_diff,
+            'ss_diff': ss_diff,
+            'F': fvalue,
+            'Pr(>F)': stats.f.sf(fvalue, df_diff, df_resid[-1]),
+        })
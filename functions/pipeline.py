@@ -0,0 +1,163 @@
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import NamedTuple, Callable, Tuple
+from ._cache import new_hash, hash_object
+
+
+class Task(NamedTuple):
+    name: str
+    func: Callable
+    deps: Tuple[str, ...]
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+
+
+def _run_task(func, kwargs):
+    return func(**kwargs)
+
+
+# Function that fingerprints a list of files by path, size and modification time
+def _file_stamps(paths):
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_size, stat.st_mtime_ns))
+        except FileNotFoundError:
+            stamps.append((path, None, None))
+    return stamps
+
+
+class Pipeline:
+    """Steps of an analysis declared as tasks, run in dependency order with independent tasks in parallel.
+
+    Each task is a function whose keyword arguments are the results of the tasks named in ``deps``. A task's
+    fingerprint covers its code, its input files and the fingerprints of its dependencies; a task is only
+    re-run when that fingerprint differs from the last successful run or one of its output files is missing.
+    Results are pickled to ``state_dir`` so up-to-date tasks can hand them to dependents without re-running.
+
+    Example::
+
+        pipeline = Pipeline('outputs/.pipeline')
+
+        @pipeline.task(inputs=['data/CS4-treelight.csv'])
+        def treelight():
+            return pd.read_csv('data/CS4-treelight.csv')
+
+        @pipeline.task(deps=['treelight'])
+        def lm_treelight_add_py(treelight):
+            return smf.ols('light ~ depth + C(species)', data=treelight).fit()
+
+        pipeline.run()
+    """
+
+    def __init__(self, state_dir='.pipeline', workers=None, executor='process'):
+        self.state_dir = state_dir
+        self.workers = workers
+        self.executor = executor
+        self.tasks = {}
+
+    def task(self, name=None, deps=(), inputs=(), outputs=()):
+        def register(func):
+            self.add(func, name=name, deps=deps, inputs=inputs, outputs=outputs)
+            return func
+        return register
+
+    def add(self, func, name=None, deps=(), inputs=(), outputs=()):
+        name = name or func.__name__
+        if name in self.tasks:
+            raise ValueError(f"A task called '{name}' already exists.")
+        self.tasks[name] = Task(name, func, tuple(deps), tuple(inputs), tuple(outputs))
+
+    def _order(self, targets):
+        # depth-first walk from the targets, giving every task after its dependencies
+        order, visiting = [], set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name not in self.tasks:
+                raise KeyError(f"Unknown task '{name}'.")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through task '{name}'.")
+            visiting.add(name)
+            for dep in self.tasks[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+    def _fingerprints(self, order):
+        fingerprints = {}
+        for name in order:
+            task = self.tasks[name]
+            h = hash_object(new_hash(), [name, task.func, _file_stamps(task.inputs), list(task.outputs)])
+            hash_object(h, [fingerprints[dep] for dep in task.deps])
+            fingerprints[name] = h.hexdigest()
+        return fingerprints
+
+    def _paths(self, name):
+        return os.path.join(self.state_dir, f'{name}.json'), os.path.join(self.state_dir, f'{name}.pkl')
+
+    def _is_current(self, name, fingerprint):
+        state_path, result_path = self._paths(name)
+        try:
+            with open(state_path) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return False
+        return (state.get('fingerprint') == fingerprint
+                and os.path.exists(result_path)
+                and all(os.path.exists(output) for output in self.tasks[name].outputs))
+
+    def _load(self, name):
+        with open(self._paths(name)[1], 'rb') as file:
+            return pickle.load(file)
+
+    def _save(self, name, fingerprint, result):
+        os.makedirs(self.state_dir, exist_ok=True)
+        state_path, result_path = self._paths(name)
+        with open(result_path, 'wb') as file:
+            pickle.dump(result, file)
+        # the fingerprint is written last, so an interrupted save leaves the task stale
+        with open(state_path, 'w') as file:
+            json.dump({'fingerprint': fingerprint}, file)
+
+    def stale(self, targets=None):
+        order = self._order(targets or list(self.tasks))
+        fingerprints = self._fingerprints(order)
+        return [name for name in order if not self._is_current(name, fingerprints[name])]
+
+    def run(self, targets=None, force=False):
+        # returns the results of the tasks that ran, of their dependencies, and of any named targets
+        order = self._order(targets or list(self.tasks))
+        fingerprints = self._fingerprints(order)
+        to_run = [name for name in order if force or not self._is_current(name, fingerprints[name])]
+        # results of up-to-date tasks come from disk, and only if something downstream needs them
+        results = {}
+        needed = {dep for name in to_run for dep in self.tasks[name].deps}
+        for name in order:
+            if name not in to_run and (name in needed or name in (targets or ())):
+                results[name] = self._load(name)
+
+        pool_class = ProcessPoolExecutor if self.executor == 'process' else ThreadPoolExecutor
+        pending, running = list(to_run), {}
+        with pool_class(max_workers=self.workers) as pool:
+            while pending or running:
+                # start every task whose dependencies have finished
+                for name in [name for name in pending if all(dep in results for dep in self.tasks[name].deps)]:
+                    task = self.tasks[name]
+                    kwargs = {dep: results[dep] for dep in task.deps}
+                    running[pool.submit(_run_task, task.func, kwargs)] = name
+                    pending.remove(name)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    self._save(name, fingerprints[name], results[name])
+        return results
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+import numpy as np
+from scipy import stats
+
+# Search brackets, as used by pingouin
+_N_BOUNDS = (2 + 1e-10, 1e07)
+_D_BOUNDS = {"two-sided": (1e-07, 10), "less": (-10, 5), "greater": (-5, 10)}
+_UNIT_BOUNDS = (1e-10, 1 - 1e-10)
+
+# Solved scenarios, so repeated requests for the same design are answered without another root-find
+_MEMO = OrderedDict()
+MEMO_SIZE = 100_000
+
+
+# Function that returns the power of a t-test; lower tails go through 1 - sf because nct.cdf can return NaN far out
+def _power_nct(nc, dof, alpha, alternative):
+    if alternative == "less":
+        return 1 - stats.nct.sf(stats.t.ppf(alpha, dof), dof, nc)
+    elif alternative == "two-sided":
+        tcrit = stats.t.ppf(1 - alpha / 2, dof)
+        return stats.nct.sf(tcrit, dof, nc) + (1 - stats.nct.sf(-tcrit, dof, nc))
+    elif alternative == "greater":
+        return stats.nct.sf(stats.t.ppf(1 - alpha, dof), dof, nc)
+    raise ValueError("alternative must be 'two-sided', 'greater' or 'less'")
+
+
+def _solve(func, lower, upper, size, log=False, max_iter=200):
+    """Root of func(x, idx) - one per element - inside [lower, upper], found for all elements together.
+
+    Uses the Illinois variant of regula falsi on every still-unconverged element at once; ``log=True`` searches
+    in log space, which suits brackets spanning orders of magnitude such as sample sizes. Elements whose
+    bracket holds no sign change come back as NaN.
+    """
+    warp, unwarp = (np.log, np.exp) if log else (lambda v: v, lambda v: v)
+    every = np.arange(size)
+    a = np.full(size, warp(lower), dtype=float)
+    b = np.full(size, warp(upper), dtype=float)
+    fa = func(unwarp(a), every)
+    fb = func(unwarp(b), every)
+
+    root = np.full(size, np.nan)
+    root[fa == 0] = a[fa == 0]
+    root[fb == 0] = b[fb == 0]
+    active = np.flatnonzero((np.sign(fa) * np.sign(fb) < 0))
+    side = np.zeros(size)
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+        A, B, FA, FB = a[active], b[active], fa[active], fb[active]
+        c = (A * FB - B * FA) / (FB - FA)
+        fc = func(unwarp(c), active)
+        converged = (fc == 0) | (np.abs(B - A) <= 1e-12 + 4 * np.finfo(float).eps * np.abs(c))
+        root[active[converged]] = c[converged]
+
+        # keep the sign change bracketed; halve the stale end's value when the same end is kept twice (Illinois)
+        left = np.sign(fc) == np.sign(FA)
+        a[active[left]], fa[active[left]] = c[left], fc[left]
+        b[active[~left]], fb[active[~left]] = c[~left], fc[~left]
+        fb[active[left & (side[active] == -1)]] *= 0.5
+        fa[active[~left & (side[active] == 1)]] *= 0.5
+        side[active] = np.where(left, -1, 1)
+        active = active[~converged]
+    root[active] = (a[active] + b[active]) / 2
+    return unwarp(root)
+
+
+# Function that works out the unique scenarios, answers the memoised ones and solves the rest in one batch
+def _memoised(kind, params, compute):
+    params = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in params])
+    shape = params[0].shape
+    rows = np.column_stack([p.ravel() for p in params])
+    unique, inverse = np.unique(rows, axis=0, return_inverse=True)
+
+    values = np.empty(len(unique))
+    missing = []
+    for i, row in enumerate(unique):
+        key = (kind, *row.tolist())
+        if key in _MEMO:
+            values[i] = _MEMO[key]
+            _MEMO.move_to_end(key)
+        else:
+            missing.append(i)
+    if missing:
+        solved = compute(*unique[missing].T)
+        values[missing] = solved
+        for i, value in zip(missing, solved):
+            _MEMO[(kind, *unique[i].tolist())] = value
+        while len(_MEMO) > MEMO_SIZE:
+            _MEMO.popitem(last=False)
+
+    result = values[inverse.ravel()].reshape(shape)
+    return result.item() if result.ndim == 0 else result
+
+
+def _one_missing(**values):
+    missing = [name for name, value in values.items() if value is None]
+    if len(missing) != 1:
+        raise ValueError(f"Exactly one of {', '.join(values)} must be None.")
+    return missing[0]
+
+
+def power_ttest(d=None, n=None, power=None, alpha=0.05, contrast="two-samples", alternative="two-sided"):
+    """Vectorised version of ``pingouin.power_ttest``.
+
+    Leave exactly one of d, n, power and alpha as None; the others may be arrays, which are broadcast against
+    each other, and the missing quantity is returned with the broadcast shape.
+    """
+    target = _one_missing(d=d, n=n, power=power, alpha=alpha)
+    if contrast.lower() not in ("one-sample", "paired", "two-samples"):
+        raise ValueError("contrast must be 'one-sample', 'paired' or 'two-samples'")
+    tsample = 2 if contrast.lower() == "two-samples" else 1
+    if d is not None and alternative == "two-sided":
+        d = np.abs(d)
+
+    def achieved(d, n, alpha):
+        return _power_nct(d * np.sqrt(n / tsample), (n - 1) * tsample, alpha, alternative)
+
+    kind = ("ttest", target, tsample, alternative)
+    if target == "power":
+        return _memoised(kind, [d, n, alpha], achieved)
+    if target == "n":
+        return _memoised(kind, [d, power, alpha], lambda d, power, alpha: _solve(
+            lambda x, i: achieved(d[i], x, alpha[i]) - power[i], *_N_BOUNDS, len(d), log=True))
+    if target == "d":
+        return _memoised(kind, [n, power, alpha], lambda n, power, alpha: _solve(
+            lambda x, i: achieved(x, n[i], alpha[i]) - power[i], *_D_BOUNDS[alternative], len(n)))
+    return _memoised(kind, [d, n, power], lambda d, n, power: _solve(
+        lambda x, i: achieved(d[i], n[i], x) - power[i], *_UNIT_BOUNDS, len(d)))
+
+
+def power_anova(eta_squared=None, k=None, n=None, power=None, alpha=0.05):
+    """Vectorised version of ``pingouin.power_anova`` for a balanced one-way ANOVA.
+
+    Leave exactly one of eta_squared, k, n, power and alpha as None; the others may be arrays, which are
+    broadcast against each other.
+    """
+    target = _one_missing(eta_squared=eta_squared, k=k, n=n, power=power, alpha=alpha)
+    if eta_squared is not None:
+        eta_squared = np.abs(eta_squared)
+
+    def achieved(eta, k, n, alpha):
+        f_sq = eta / (1 - eta)
+        dof1, dof2 = k - 1, n * k - k
+        return stats.ncf.sf(stats.f.ppf(1 - alpha, dof1, dof2), dof1, dof2, n * k * f_sq)
+
+    kind = ("anova", target)
+    if target == "power":
+        return _memoised(kind, [eta_squared, k, n, alpha], achieved)
+    if target == "k":
+        return _memoised(kind, [eta_squared, n, power, alpha], lambda eta, n, power, alpha: _solve(
+            lambda x, i: achieved(eta[i], x, n[i], alpha[i]) - power[i], 2, 100, len(eta)))
+    if target == "n":
+        return _memoised(kind, [eta_squared, k, power, alpha], lambda eta, k, power, alpha: _solve(
+            lambda x, i: achieved(eta[i], k[i], x, alpha[i]) - power[i], 2, 1e07, len(eta), log=True))
+    if target == "eta_squared":
+        return _memoised(kind, [k, n, power, alpha], lambda k, n, power, alpha: _solve(
+            lambda x, i: achieved(x, k[i], n[i], alpha[i]) - power[i], *_UNIT_BOUNDS, len(k)))
+    return _memoised(kind, [eta_squared, k, n, power], lambda eta, k, n, power: _solve(
+        lambda x, i: achieved(eta[i], k[i], n[i], x) - power[i], *_UNIT_BOUNDS, len(eta)))
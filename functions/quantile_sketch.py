@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+from plotnine import ggplot, aes, geom_point, geom_line, stat_qq, stat_qq_line
+
+# Samples larger than this are summarised with a sketch before drawing a Q-Q plot
+SKETCH_THRESHOLD = 100_000
+
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch.
+
+    Each level holds at most ``k`` items; an item on level h stands for 2**h observations. When a level
+    overflows it is sorted and every other item (from a random offset) is promoted to the next level,
+    so memory stays at O(k log(n / k)) however many values are added.
+    """
+
+    def __init__(self, k=2048, block_size=65536, seed=None):
+        self.k = k
+        self.block_size = block_size
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.n
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        # feed the input through in blocks so the working buffer never grows with n
+        for start in range(0, len(values), self.block_size):
+            self._levels[0] = np.concatenate([self._levels[0], values[start:start + self.block_size]])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        # sketches built on separate chunks of data combine level by level
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # an odd item out stays behind so the promoted half carries exactly twice the weight
+                keep = items[:len(items) % 2]
+                promoted = items[len(keep) + self._rng.integers(2)::2]
+                self._levels[level] = keep
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+            level += 1
+
+    def quantile(self, q):
+        q = np.asarray(q, dtype=float)
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                  for level, level_items in enumerate(self._levels)])
+        order = np.argsort(items)
+        items, weights = items[order], weights[order]
+        # place each item at the midpoint of the rank range it represents and interpolate between them
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        positions = np.concatenate([[0.0], positions, [1.0]])
+        items = np.concatenate([[self.min], items, [self.max]])
+        return np.interp(q, positions, items)
+
+
+# Function that returns theoretical and sample quantiles of a sketch, plus the reference line through its quartiles
+def qq_frame(sketch, n_quantiles=1000):
+    # plotting positions as in plotnine's stat_qq (alpha = beta = 3/8)
+    probs = (np.arange(1, n_quantiles + 1) - 3 / 8) / (n_quantiles + 1 / 4)
+    points = pd.DataFrame({"theoretical": stats.norm.ppf(probs), "sample": sketch.quantile(probs)})
+
+    line_x = stats.norm.ppf([0.25, 0.75])
+    line_y = sketch.quantile([0.25, 0.75])
+    slope = (line_y[1] - line_y[0]) / (line_x[1] - line_x[0])
+    intercept = line_y[0] - slope * line_x[0]
+    ends = points["theoretical"].iloc[[0, -1]].to_numpy()
+    line = pd.DataFrame({"theoretical": ends, "sample": intercept + slope * ends})
+    return points, line
+
+
+# Function that makes a Q-Q plot, drawing a fixed number of sketch quantiles when the sample is large; the sketch is
+# seeded, so the same sample always gives the same plot
+def qq_plot(sample, n_quantiles=1000, sketch_threshold=SKETCH_THRESHOLD, colour="blue", seed=0):
+    if not isinstance(sample, QuantileSketch):
+        sample = np.asarray(sample, dtype=float)
+        if len(sample) <= sketch_threshold:
+            return (ggplot(pd.DataFrame({"sample": sample}), aes(sample="sample"))
+                    + stat_qq()
+                    + stat_qq_line(colour=colour))
+        sample = QuantileSketch(seed=seed).update(sample)
+
+    points, line = qq_frame(sample, n_quantiles)
+    return (ggplot(points, aes(x="theoretical", y="sample"))
+            + geom_point()
+            + geom_line(data=line, colour=colour))
@@ -0,0 +1,69 @@
+import os
+import shutil
+from ._cache import new_hash, hash_object, prune_directory, touch
+
+# Rendered plots are kept here, named by the hash of the plot that produced them
+DEFAULT_CACHE_DIR = os.environ.get('FUNCTIONS_RENDER_CACHE',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'functions', 'renders'))
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+# Function that says whether the environment asks for every plot to be re-rendered (FUNCTIONS_FORCE_RENDER=1)
+def force_render():
+    return os.environ.get('FUNCTIONS_FORCE_RENDER', '').lower() in ('1', 'true', 'yes')
+
+
+# Function that returns the versions of the libraries that draw a plot, which are part of every render key
+def renderer_versions():
+    import matplotlib
+    import plotnine
+    return [plotnine.__version__, matplotlib.__version__]
+
+
+# Function that hashes a ggplot's data and layer/scale/theme spec together with the save settings
+def plot_key(plot, **save_kwargs):
+    h = new_hash()
+    hash_object(h, [renderer_versions(), save_kwargs])
+    hash_object(h, plot)
+    return h.hexdigest()
+
+
+class RenderCache:
+    """Content-addressed store of rendered plot files, evicting least recently used files past max_bytes."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key, filename):
+        return os.path.join(self.directory, key + os.path.splitext(filename)[1])
+
+    def fetch(self, key, filename):
+        # copy a previously rendered artifact to filename; False if there is none
+        cached = self.path(key, filename)
+        try:
+            shutil.copyfile(cached, filename)
+        except FileNotFoundError:
+            return False
+        touch(cached)
+        return True
+
+    def store(self, key, filename):
+        os.makedirs(self.directory, exist_ok=True)
+        cached = self.path(key, filename)
+        # write under a temporary name first so concurrent readers never see a partial file
+        partial = f'{cached}.{os.getpid()}.tmp'
+        shutil.copyfile(filename, partial)
+        os.replace(partial, cached)
+        self.prune()
+
+    def prune(self):
+        if os.path.isdir(self.directory):
+            prune_directory(self.directory, max_bytes=self.max_bytes)
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            prune_directory(self.directory, max_bytes=0)
+
+
+default_cache = RenderCache()
@@ -0,0 +1,21 @@
+import os
+
+# Named size/resolution settings for saved plots: a quick draft for iterating and the full print-quality render
+PROFILES = {
+    'draft': dict(height=15, width=20, units='cm', dpi=100),
+    'final': dict(height=15, width=20, units='cm', dpi=600),
+}
+
+# Profile used when none is given; FUNCTIONS_RENDER_PROFILE=draft makes a whole run render drafts
+DEFAULT_PROFILE = os.environ.get('FUNCTIONS_RENDER_PROFILE', 'final')
+
+
+# Function that turns a profile name (or a dict of save settings) into the keyword arguments for ggplot.save
+def render_settings(profile=None):
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, dict):
+        return dict(profile)
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown render profile '{profile}', choose from {sorted(PROFILES)}.")
+    return dict(PROFILES[profile])
@@ -0,0 +1,120 @@
+import sqlite3
+import time
+import uuid
+import numbers
+import numpy as np
+import pandas as pd
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    dataset TEXT,
+    title TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    term TEXT,
+    statistic TEXT NOT NULL,
+    value REAL,
+    text_value TEXT
+);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_dataset_title ON results (dataset, title);
+CREATE INDEX IF NOT EXISTS results_title_term ON results (title, term, statistic);
+"""
+
+
+# Function that splits a cell into the numeric and text columns of the results table
+def _typed(value):
+    if isinstance(value, (bool, np.bool_)):
+        return float(value), None
+    if isinstance(value, numbers.Number) and not isinstance(value, complex):
+        return (None if np.isnan(value) else float(value)), None
+    if value is None or value is pd.NA:
+        return None, None
+    try:
+        # numbers that arrive as text, such as pingouin's BF10
+        return float(value), None
+    except (TypeError, ValueError):
+        return None, str(value)
+
+
+class ResultsStore:
+    """Analysis results kept as typed rows in an SQLite file.
+
+    Every cell of a results table becomes one row (run, dataset, title, kind, term, statistic, value), where the
+    term is the table's row label (e.g. 'C(species)[T.Conifer]' or 'Residual') and the statistic its column name
+    (e.g. 'PR(>F)'). Numbers go in ``value``; anything else in ``text_value``.
+    """
+
+    def __init__(self, path, run_id=None, label=None):
+        self.path = path
+        self.run_id = run_id or f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", (self.run_id, time.time(), label))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def add_table(self, title, table, kind='table', dataset=None):
+        if isinstance(table, pd.Series):
+            table = table.to_frame()
+        rows = []
+        for term, record in zip(table.index, table.itertuples(index=False, name=None)):
+            for statistic, cell in zip(table.columns, record):
+                if isinstance(cell, (list, tuple, np.ndarray)):
+                    # array cells such as a confidence interval become one row per element: 'CI95%[0]', 'CI95%[1]'
+                    for i, element in enumerate(np.ravel(cell)):
+                        rows.append((self.run_id, dataset, title, kind, str(term), f'{statistic}[{i}]',
+                                     *_typed(element)))
+                else:
+                    rows.append((self.run_id, dataset, title, kind, str(term), str(statistic), *_typed(cell)))
+        with self._conn:
+            self._conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def add_coefficients(self, title, results, dataset=None):
+        # coefficient table of a statsmodels fit, with the same columns as its summary()
+        conf_int = results.conf_int()
+        table = pd.DataFrame({
+            'coef': results.params,
+            'std err': results.bse,
+            't': results.tvalues,
+            'P>|t|': results.pvalues,
+            '[0.025': conf_int.iloc[:, 0],
+            '0.975]': conf_int.iloc[:, 1],
+        })
+        self.add_table(title, table, kind='coefficients', dataset=dataset)
+
+    def add_anova(self, title, anova_table, dataset=None):
+        self.add_table(title, anova_table, kind='anova', dataset=dataset)
+
+    def add_test(self, title, test_table, dataset=None):
+        # e.g. the DataFrames returned by pingouin's ttest, anova or kruskal
+        self.add_table(title, test_table, kind='test', dataset=dataset)
+
+    def add_value(self, title, value, kind='power', dataset=None, term=None, statistic='value'):
+        # a single result such as the sample size returned by pingouin.power_ttest
+        with self._conn:
+            self._conn.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                               (self.run_id, dataset, title, kind, term, statistic, *_typed(value)))
+
+    def query(self, run_id=None, dataset=None, title=None, kind=None, term=None, statistic=None):
+        filters = dict(run_id=run_id, dataset=dataset, title=title, kind=kind, term=term, statistic=statistic)
+        clauses = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        params = [value for value in filters.values() if value is not None]
+        return pd.read_sql_query(f"SELECT * FROM results{where}", self._conn, params=params)
+
+    def runs(self):
+        return pd.read_sql_query("SELECT * FROM runs ORDER BY created", self._conn)
@@ -1,11 +1,69 @@
+import copy
+import os
+from .render_cache import default_cache, force_render, plot_key
+from .render_profiles import render_settings
+from .tracing import span
 
-# Function that will save a plot to a png file
-def save_plot(filename, plot):
 
-    plot.save(filename=filename,
-              height=15,
-              width=20,
-              units='cm',
-              dpi=600)
+# Function that will save a plot to a png file, reusing an earlier render of an identical plot if there is one
+def save_plot(filename, plot, profile=None, defer=False, cache=True, force=False):
+    if defer:
+        # render a quick draft now and keep the spec so the full-quality version can be exported later; a copy,
+        # since plotnine's `plot += layer` changes the plot in place
+        deferred_exports.add(filename, copy.deepcopy(plot), profile)
+        profile = 'draft'
+    settings = render_settings(profile)
 
+    with span('save_plot', filename=filename, profile=profile):
+        if cache:
+            with span('save_plot.cache_fetch'):
+                key = plot_key(plot, **settings)
+                if not (force or force_render()) and default_cache.fetch(key, filename):
+                    return
 
+        # drawing shows up as a nested plotnine.draw span when the libraries are instrumented; the rest is encoding
+        with span('save_plot.render'):
+            plot.save(filename=filename, **settings)
+        if cache:
+            with span('save_plot.cache_store'):
+                default_cache.store(key, filename)
+
+
+def _export(filename, plot, profile, cache, force):
+    save_plot(filename, plot, profile=profile, cache=cache, force=force)
+    return filename
+
+
+class ExportQueue:
+    """Plots waiting to be saved, rendered together in one batch (in a process pool when workers > 1)."""
+
+    def __init__(self):
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, filename, plot, profile=None):
+        # a later request for the same file replaces the earlier one
+        self._pending[filename] = (plot, profile)
+
+    def render(self, workers=None, cache=True, force=False):
+        pending, self._pending = self._pending, {}
+        workers = min(len(pending), workers or os.cpu_count() or 1)
+        if workers <= 1:
+            return [_export(filename, plot, profile, cache, force) for filename, (plot, profile) in pending.items()]
+        # a multiprocessing pool rather than concurrent.futures, which refuses new work once the interpreter has
+        # started shutting down, so a queue can also be rendered from an atexit hook
+        from multiprocessing import Pool
+        with Pool(processes=workers) as pool:
+            return pool.starmap(_export, [(filename, plot, profile, cache, force)
+                                          for filename, (plot, profile) in pending.items()])
+
+
+# Queue filled by save_plot(..., defer=True)
+deferred_exports = ExportQueue()
+
+
+# Function that renders every deferred plot at its requested profile
+def render_deferred(workers=None, cache=True, force=False):
+    return deferred_exports.render(workers=workers, cache=cache, force=force)
@@ -0,0 +1,80 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import anova_lm
+
+
+# Function that simulates one batch of datasets from its own seed and returns the ANOVA p-value of every term
+def _simulate_batch(generate, formula, n, typ, seed, size):
+    rng = np.random.default_rng(seed)
+    tables = []
+    for _ in range(size):
+        try:
+            table = anova_lm(smf.ols(formula, data=generate(n, rng)).fit(), typ=typ)
+            tables.append(table['PR(>F)'].drop('Residual'))
+        except (ValueError, np.linalg.LinAlgError):
+            # a dataset the model cannot be tested on (e.g. a factor drawn with one level) counts as not rejected
+            tables.append(pd.Series(dtype=float))
+    return pd.DataFrame(tables).reset_index(drop=True)
+
+
+def simulate_power(generate, formula, n, terms=None, alpha=0.05, n_sims=1000, batch_size=50, typ=2, seed=None,
+                   max_se=None, workers=None, executor='process', progress=None):
+    """Power of the ANOVA F-tests of an OLS formula, estimated by fitting it to simulated datasets.
+
+    ``generate(n, rng)`` must return a DataFrame of n observations drawn with the numpy Generator ``rng``, so
+    any design can be simulated: skewed errors, unequal groups, covariates... (for ``executor='process'`` it
+    has to be a module-level function). Replicates run in batches of ``batch_size``, each with its own stream
+    spawned from ``seed``, so the result does not depend on the number of workers. Batches are combined in
+    order; with ``max_se`` the simulation stops once the Monte Carlo standard error of every term's power is
+    at most ``max_se``. ``progress(done, n_sims, power)`` is called after every batch.
+
+    Returns one row per term with the power, its standard error and the number of simulations used.
+    """
+    n_batches = -(-n_sims // batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    sizes = [min(batch_size, n_sims - i * batch_size) for i in range(n_batches)]
+
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    pvalues = []
+    with pool_class(max_workers=workers) as pool:
+        futures = [pool.submit(_simulate_batch, generate, formula, n, typ, batch_seed, size)
+                   for batch_seed, size in zip(seeds, sizes)]
+        for future in futures:
+            batch = future.result()
+            pvalues.append(batch if terms is None else batch[list(terms)])
+            rejected = pd.concat(pvalues, ignore_index=True) < alpha
+            done = len(rejected)
+            power = rejected.mean()
+            se = np.sqrt(power * (1 - power) / done)
+            if progress is not None:
+                progress(done, n_sims, power)
+            # two batches at least, so a lucky first batch with power 0 or 1 (and se 0) cannot stop the run
+            if max_se is not None and len(pvalues) > 1 and (se <= max_se).all():
+                for pending in futures:
+                    pending.cancel()
+                break
+
+    return pd.DataFrame({'n': n, 'power': power, 'se': se, 'n_sims': done})
+
+
+def required_n(generate, formula, term, power=0.80, n_min=4, n_max=1000, **simulate_kwargs):
+    """Smallest n whose simulated power for ``term`` reaches ``power``, found by bisection over [n_min, n_max].
+
+    Every candidate n is simulated from the same seed (common random numbers), which keeps the estimated power
+    curve close to monotone. Returns NaN when even ``n_max`` falls short. Other arguments go to simulate_power.
+    """
+    def reaches(n):
+        return simulate_power(generate, formula, n, terms=[term], **simulate_kwargs).loc[term, 'power'] >= power
+
+    if not reaches(n_max):
+        return np.nan
+    lower, upper = n_min - 1, n_max
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        if reaches(middle):
+            upper = middle
+        else:
+            lower = middle
+    return upper
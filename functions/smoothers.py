@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+
+# Function that assigns each x value to one of `bins` equal-width bins and returns the bin index and centres
+def _bin_index(x, bins):
+    lo, hi = x.min(), x.max()
+    width = (hi - lo) / bins
+    if width == 0:
+        return np.zeros(len(x), dtype=np.int64), np.full(bins, lo)
+    idx = np.minimum(((x - lo) / width).astype(np.int64), bins - 1)
+    centres = lo + width * (np.arange(bins) + 0.5)
+    return idx, centres
+
+
+# Function that computes the per-bin median in linear time: counting-sort by bin, then partition each bin
+def _bin_medians(idx, y, counts):
+    order = np.argsort(idx.astype(np.int16), kind="stable")
+    sorted_y = y[order]
+    medians = np.full(len(counts), np.nan)
+    stop = np.cumsum(counts)
+    for b in np.flatnonzero(counts):
+        medians[b] = np.median(sorted_y[stop[b] - counts[b]:stop[b]])
+    return medians
+
+
+# Function that smooths y against x by binning along x, so it costs O(n) and returns at most `bins` points
+def binned_smooth(x, y, bins=50, statistic="mean", window=3):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    if len(x) == 0:
+        return pd.DataFrame({"x": [], "y": []})
+    # small samples get about sqrt(n) bins so each bin still averages several points
+    bins = min(bins, int(np.sqrt(len(x))) or 1, 32767)
+
+    idx, centres = _bin_index(x, bins)
+    counts = np.bincount(idx, minlength=bins).astype(float)
+    if statistic == "mean":
+        values = np.bincount(idx, weights=y, minlength=bins) / np.where(counts > 0, counts, 1)
+    elif statistic == "median":
+        values = _bin_medians(idx, y, counts.astype(np.int64))
+    else:
+        raise ValueError("statistic must be 'mean' or 'median'")
+
+    # count-weighted running mean over neighbouring bins takes the jitter out of the curve
+    occupied = counts > 0
+    values = np.where(occupied, values, 0.0)
+    # 'full' and the centred slice rather than 'same', which returns the kernel's length when there are fewer bins
+    kernel = np.ones(window)
+    centre = slice((window - 1) // 2, (window - 1) // 2 + bins)
+    smoothed = (np.convolve(values * counts, kernel, "full")[centre]
+                / np.maximum(np.convolve(counts, kernel, "full")[centre], 1))
+    return pd.DataFrame({"x": centres[occupied], "y": smoothed[occupied]})
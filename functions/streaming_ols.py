@@ -0,0 +1,250 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import patsy
+from scipy import stats
+from .nested_models import anova_from_factor
+
+
+# Function that returns the data columns a formula refers to, and which of them it treats as categorical
+def formula_columns(formula, columns):
+    description = patsy.ModelDesc.from_formula(formula)
+    referenced, categorical = set(), set()
+    for term in description.lhs_termlist + description.rhs_termlist:
+        for factor in term.factors:
+            names = set(re.findall(r'[A-Za-z_]\w*', factor.code)) & set(columns)
+            referenced |= names
+            if factor.code.startswith('C('):
+                categorical |= names
+    return [column for column in columns if column in referenced], categorical
+
+
+# Function that yields DataFrame chunks of some columns of a CSV, Parquet or Feather/Arrow file
+def read_chunks(path, columns=None, chunksize=100_000, **read_csv_kwargs):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        from pyarrow import parquet
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif extension in ('.feather', '.arrow'):
+        from pyarrow import ipc
+        with ipc.open_file(path) as reader:
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield (batch.select(columns) if columns is not None else batch).to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize, **read_csv_kwargs)
+
+
+def _header(path, **read_csv_kwargs):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        from pyarrow import parquet
+        schema = parquet.read_schema(path)
+    elif extension in ('.feather', '.arrow'):
+        from pyarrow import ipc
+        with ipc.open_file(path) as reader:
+            schema = reader.schema
+    else:
+        return pd.read_csv(path, nrows=100, **read_csv_kwargs)
+    return schema.empty_table().to_pandas()
+
+
+def _is_categorical(series):
+    return not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+
+
+class StreamingOLS:
+    """Ordinary least squares fitted chunk by chunk, for tables too large to hold in memory.
+
+    The state is the triangular factor R of [X y] (so R'R holds X'X, X'y and y'y), the row count and running
+    moments of y, which takes O(p^2) memory whatever the number of rows. Chunks can be fed in any order, and
+    the states of models fitted on separate parts of the data (e.g. in other processes) combine with merge().
+    Coefficients, standard errors, R-squared and ANOVA tables agree with ``smf.ols(formula, data).fit()``.
+
+    Every categorical variable must be declared up front with all of its levels, so all chunks share one design;
+    fit_file() and fit_files() collect the levels in a first, cheap pass. Stateful transforms that need the
+    whole column, such as center() or standardize(), are not supported.
+    """
+
+    def __init__(self, formula, levels=None, numeric=()):
+        self.formula = formula
+        self.levels = {column: list(values) for column, values in (levels or {}).items()}
+        # a one-row frame with every variable is enough for patsy to fix the design's columns
+        prototype = {column: pd.Categorical([values[0]], categories=values) for column, values in self.levels.items()}
+        prototype.update({column: [0.0] for column in numeric})
+        endog, exog = patsy.dmatrices(formula, pd.DataFrame(prototype), NA_action='raise')
+        self._infos = [endog.design_info, exog.design_info]
+        self.design_info = exog.design_info
+        self.endog_name = endog.design_info.column_names[0]
+        self.nobs = 0
+        self._r = np.zeros((0, len(self.design_info.column_names) + 1))
+        self._mean_y = 0.0
+        self._m2_y = 0.0
+
+    def update(self, chunk):
+        chunk = chunk.assign(**{column: pd.Categorical(chunk[column], categories=values)
+                                for column, values in self.levels.items() if column in chunk})
+        endog, exog = patsy.build_design_matrices(self._infos, chunk, NA_action='drop')
+        y = np.asarray(endog)[:, 0]
+        if len(y) == 0:
+            return self
+        r = np.linalg.qr(np.column_stack([np.asarray(exog), y]), mode='r')
+        return self.merge_state((r, len(y), y.mean(), np.sum((y - y.mean()) ** 2)))
+
+    def merge(self, other):
+        return self.merge_state(other.state())
+
+    def state(self):
+        # plain arrays, for handing a partial fit between processes (patsy designs cannot be pickled)
+        return self._r, self.nobs, self._mean_y, self._m2_y
+
+    def merge_state(self, state):
+        r, nobs, mean_y, m2_y = state
+        if nobs == 0:
+            return self
+        # stacking two triangular factors and re-triangularising gives the factor of all rows together
+        self._r = np.linalg.qr(np.vstack([self._r, r]), mode='r')
+        total = self.nobs + nobs
+        delta = mean_y - self._mean_y
+        self._m2_y += m2_y + delta ** 2 * self.nobs * nobs / total
+        self._mean_y += delta * nobs / total
+        self.nobs = total
+        return self
+
+    @property
+    def xtx(self):
+        return self._r[:, :-1].T @ self._r[:, :-1]
+
+    @property
+    def xty(self):
+        return self._r[:, :-1].T @ self._r[:, -1]
+
+    @property
+    def yty(self):
+        return self._r[:, -1] @ self._r[:, -1]
+
+    @property
+    def _solution(self):
+        params, _, rank, _ = np.linalg.lstsq(self._r[:, :-1], self._r[:, -1], rcond=None)
+        residual = self._r[:, -1] - self._r[:, :-1] @ params
+        return params, residual @ residual, rank
+
+    @property
+    def params(self):
+        return pd.Series(self._solution[0], index=self.design_info.column_names)
+
+    @property
+    def ssr(self):
+        return self._solution[1]
+
+    @property
+    def df_resid(self):
+        return float(self.nobs - self._solution[2])
+
+    @property
+    def df_model(self):
+        return float(self._solution[2] - ('Intercept' in self.design_info.term_names))
+
+    @property
+    def scale(self):
+        return self.ssr / self.df_resid
+
+    def cov_params(self):
+        r_inverse = np.linalg.pinv(self._r[:, :-1])
+        names = self.design_info.column_names
+        return pd.DataFrame(self.scale * r_inverse @ r_inverse.T, index=names, columns=names)
+
+    @property
+    def bse(self):
+        return pd.Series(np.sqrt(np.diag(self.cov_params())), index=self.design_info.column_names)
+
+    @property
+    def tvalues(self):
+        return self.params / self.bse
+
+    @property
+    def pvalues(self):
+        return 2 * pd.Series(stats.t.sf(np.abs(self.tvalues), self.df_resid), index=self.design_info.column_names)
+
+    def conf_int(self, alpha=0.05):
+        half_width = stats.t.ppf(1 - alpha / 2, self.df_resid) * self.bse
+        return pd.DataFrame({0: self.params - half_width, 1: self.params + half_width})
+
+    @property
+    def centered_tss(self):
+        return self._m2_y
+
+    @property
+    def rsquared(self):
+        # as statsmodels: centred total sum of squares with an intercept, uncentred without
+        tss = self._m2_y if 'Intercept' in self.design_info.term_names else self.yty
+        return 1 - self.ssr / tss
+
+    @property
+    def rsquared_adj(self):
+        shift = 'Intercept' in self.design_info.term_names
+        return 1 - (self.nobs - shift) / self.df_resid * (1 - self.rsquared)
+
+    @property
+    def fvalue(self):
+        return (self.centered_tss - self.ssr) / self.df_model / self.scale
+
+    def anova(self, typ=1):
+        return anova_from_factor(self._r, self.design_info, self.nobs, typ)
+
+
+# Function that collects the levels of a formula's categorical variables from a set of files
+def collect_levels(formula, paths, chunksize=100_000, **read_csv_kwargs):
+    header = _header(paths[0], **read_csv_kwargs)
+    columns, categorical = formula_columns(formula, header.columns)
+    categorical |= {column for column in columns if _is_categorical(header[column])}
+    seen = {column: set() for column in categorical}
+    if seen:
+        for path in paths:
+            for chunk in read_chunks(path, sorted(seen), chunksize, **read_csv_kwargs):
+                for column in seen:
+                    seen[column].update(chunk[column].dropna().unique())
+    # sorted, as patsy sorts the levels it finds in a full DataFrame
+    levels = {column: sorted(values) for column, values in seen.items()}
+    numeric = [column for column in columns if column not in levels]
+    return columns, levels, numeric
+
+
+def _fit_part(formula, levels, numeric, columns, path, chunksize, read_csv_kwargs):
+    model = StreamingOLS(formula, levels, numeric)
+    for chunk in read_chunks(path, columns, chunksize, **read_csv_kwargs):
+        model.update(chunk)
+    return model.state()
+
+
+def fit_files(formula, paths, chunksize=100_000, workers=None, levels=None, **read_csv_kwargs):
+    """Fit an OLS formula to the rows of several CSV, Parquet or Feather files, one process per file.
+
+    Only the columns the formula uses are read, ``chunksize`` rows at a time. Unless ``levels`` is given, the
+    levels of categorical variables are found in a first pass over those columns.
+    """
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    if levels is None:
+        columns, levels, numeric = collect_levels(formula, paths, chunksize, **read_csv_kwargs)
+    else:
+        columns, _ = formula_columns(formula, _header(paths[0], **read_csv_kwargs).columns)
+        numeric = [column for column in columns if column not in levels]
+    model = StreamingOLS(formula, levels, numeric)
+    if len(paths) == 1 or workers == 1:
+        for path in paths:
+            model.merge_state(_fit_part(formula, levels, numeric, columns, path, chunksize, read_csv_kwargs))
+        return model
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_fit_part, formula, levels, numeric, columns, path, chunksize, read_csv_kwargs)
+                   for path in paths]
+        for future in futures:
+            model.merge_state(future.result())
+    return model
+
+
+def fit_file(formula, path, chunksize=100_000, levels=None, **read_csv_kwargs):
+    return fit_files(formula, [path], chunksize=chunksize, levels=levels, **read_csv_kwargs)
+
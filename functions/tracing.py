@@ -0,0 +1,166 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Set FUNCTIONS_TRACE=trace.json to trace a whole run: spans are recorded from the first import of this module and
+# written to that file (with the summary table on stderr) when the interpreter exits
+TRACE_ENV = 'FUNCTIONS_TRACE'
+
+_enabled = False
+_events = []
+_local = threading.local()
+_origin = time.perf_counter_ns()
+_patched = []
+
+
+class _NullSpan:
+    # what span() hands out while tracing is off: entering and leaving it does nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start', 'children')
+
+    def __init__(self, name, args):
+        self.name, self.args = name, args
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.children = 0
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter_ns() - self.start
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        # list.append is atomic, so threads can share the event list without a lock
+        _events.append((self.name, self.start, duration, duration - self.children, os.getpid(),
+                        threading.get_ident(), len(stack), self.args))
+        return False
+
+
+# Function that opens a timing span: `with span('fit', formula=formula): ...`, nested spans become children; the
+# name is positional-only, so `name` can be a span argument too
+def span(name, /, **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+# Function that wraps a function in a span named after it (or after `name`)
+def traced(name=None, /):
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _patch(owner, attribute, label):
+    original = getattr(owner, attribute)
+    setattr(owner, attribute, traced(label)(original))
+    _patched.append((owner, attribute, original))
+
+
+# Function that wraps the library calls an analysis spends its time in (reading CSVs, fitting, influence
+# measures, drawing and saving plots) in spans, so scripts that call them directly are traced as well
+def instrument():
+    if _patched:
+        return
+    import pandas as pd
+    from statsmodels.regression.linear_model import RegressionModel, OLSResults
+    from plotnine import ggplot
+    _patch(pd, 'read_csv', 'pandas.read_csv')
+    _patch(RegressionModel, 'fit', 'statsmodels.fit')
+    _patch(OLSResults, 'get_influence', 'statsmodels.get_influence')
+    _patch(ggplot, 'draw', 'plotnine.draw')
+    _patch(ggplot, 'save', 'plotnine.save')
+
+
+def uninstrument():
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+
+def enable_tracing(instrument_libraries=True):
+    global _enabled
+    _enabled = True
+    if instrument_libraries:
+        instrument()
+
+
+def disable_tracing():
+    global _enabled
+    _enabled = False
+    uninstrument()
+
+
+def tracing_enabled():
+    return _enabled
+
+
+def reset_trace():
+    _events.clear()
+
+
+# Function that writes the recorded spans as a Chrome trace, for chrome://tracing or https://ui.perfetto.dev
+def export_trace(path):
+    events = [{'name': name, 'cat': 'functions', 'ph': 'X', 'ts': (start - _origin) / 1000, 'dur': duration / 1000,
+               'pid': pid, 'tid': tid, 'args': {key: str(value) for key, value in args.items()}}
+              for name, start, duration, _, pid, tid, _, args in list(_events)]
+    with open(path, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+    return path
+
+
+def trace_summary():
+    """Time per span name: calls, total and self time (total minus time in nested spans) and mean, in seconds.
+
+    Sorted by self time, so the first rows are where the run actually spends its time.
+    """
+    import pandas as pd
+    columns = ['calls', 'total', 'self', 'mean']
+    rows = {}
+    for name, _, duration, self_time, *_ in list(_events):
+        calls, total, own = rows.get(name, (0, 0, 0))
+        rows[name] = (calls + 1, total + duration, own + self_time)
+    summary = pd.DataFrame([(calls, total / 1e9, own / 1e9, total / calls / 1e9)
+                            for calls, total, own in rows.values()], index=list(rows), columns=columns)
+    summary.index.name = 'span'
+    return summary.sort_values('self', ascending=False)
+
+
+def _export_at_exit(path, pid):
+    # worker processes forked from a traced run inherit this hook; only the process that registered it writes
+    if _events and os.getpid() == pid:
+        export_trace(path)
+        print(trace_summary().to_string(float_format='{:.4f}'.format), file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    enable_tracing()
+    atexit.register(_export_at_exit, os.environ[TRACE_ENV], os.getpid())
@@ -1,6 +1,7 @@
 import pandas as pd
 import pingouin as pg
 from plotnine import *
+from functions import *
 
 # Working Directory
 work_dir = '/Users/couttsj/Desktop/Statistics_Course/'
@@ -23,7 +24,7 @@ hist_one.show()
 
 # The data could be normal so look a Q-Q plot
 # Quantile-Quantile plot is a diagnostic plot that compares two distributions
-qq_one = (ggplot(fishlength_py, aes(sample=fishlength_py.length)) + stat_qq() + stat_qq_line(colour="blue"))
+qq_one = qq_plot(fishlength_py.length)
 qq_one.show()  # Points should lie on the line if distributions the same
 
 # Points from either end of the sample distribution diverge from where they
@@ -85,7 +86,7 @@ hist_three = (ggplot(gastric_juices, aes("dissolving_time")) + geom_histogram(bi
 hist_three.show()
 
 # Plot q-q plot
-qq_three = (ggplot(gastric_juices, aes(sample=gastric_juices.dissolving_time)) + stat_qq() + stat_qq_line(colour="blue"))
+qq_three = qq_plot(gastric_juices.dissolving_time)
 qq_three.show() # Looks like it follows normal distribution
 
 # Normal data so a one-sample t-test is appropriate
@@ -57,21 +57,15 @@ sheltered_group = oystercatcher_py[oystercatcher_py['site'] == 'sheltered']
 
 # Assess normality of groups with Q-Q plots - Never use Shapiro-Wilk test
 # Exposed Group
-qq_one_exposed = (ggplot(exposed_group, aes(sample=exposed_group.feeding))
-                  + stat_qq()
-                  + stat_qq_line(colour="blue")
+qq_one_exposed = (qq_plot(exposed_group.feeding)
                   + labs(title='Q-Q Plot of Feeding by Site - Exposed'))
 qq_one_exposed.show()  # Points should lie on the line if distributions the same
 # Partial Group
-qq_one_partial = (ggplot(partial_group, aes(sample=partial_group.feeding))
-                  + stat_qq()
-                  + stat_qq_line(colour="blue")
+qq_one_partial = (qq_plot(partial_group.feeding)
                   + labs(title='Q-Q Plot of Feeding by Site - Partial'))
 qq_one_partial.show()
 # Sheltered Group
-qq_one_sheltered = (ggplot(sheltered_group, aes(sample=sheltered_group.feeding))
-                    + stat_qq()
-                    + stat_qq_line(colour="blue")
+qq_one_sheltered = (qq_plot(sheltered_group.feeding)
                     + labs(title='Q-Q Plot of Feeding by Site - Sheltered'))
 qq_one_sheltered.show()
 
@@ -95,9 +89,7 @@ lm_oystercatcher_py = model.fit()
 # Get the residuals from the fitted model parameters
 resids = lm_oystercatcher_py.resid
 # Create a Q-Q plot for the residuals
-qq_resids_one = (ggplot(oystercatcher_py, aes(sample=resids))
-                 + stat_qq()
-                 + stat_qq_line(colour="blue")
+qq_resids_one = (qq_plot(resids)
                  + labs(title='Q-Q Residuals'))
 qq_resids_one.show()
 
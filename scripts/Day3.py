@@ -68,8 +68,8 @@ interactions and the main effects of each predictor variable. This is called an
 # Visualise data with an interaction plot
 int_plot_one = (ggplot(exercise_py, aes(x="sex", y="weight", colour="exercise", group="exercise"))
                 + geom_jitter(width=0.05)
-                + stat_summary(fun_data="mean_cl_boot", geom="point", size=3)
-                + stat_summary(fun_data="mean_cl_boot", geom="line")
+                + stat_summary(fun_data=mean_cl_boot, geom="point", size=3)
+                + stat_summary(fun_data=mean_cl_boot, geom="line")
                 + scale_colour_brewer(type="qual", palette="Dark2"))
 int_plot_one.save(filename=f'{plot_dir}day3-int_plot_one.png', height=15, width=20, units='cm', dpi=600)
 
@@ -85,8 +85,8 @@ Plot the interaction plot the other way round:
 # Visualise data with the other interaction plot
 int_plot_two = (ggplot(exercise_py, aes(x="exercise", y="weight", colour="sex", group="sex"))
                 + geom_jitter(width=0.05)
-                + stat_summary(fun_data="mean_cl_boot", geom="point", size=3)
-                + stat_summary(fun_data="mean_cl_boot", geom="line")
+                + stat_summary(fun_data=mean_cl_boot, geom="point", size=3)
+                + stat_summary(fun_data=mean_cl_boot, geom="line")
                 + scale_colour_brewer(type="qual", palette="Dark2"))
 # Save Plot
 int_plot_two.save(filename=f'{plot_dir}day3-int_plot_two.png', height=15, width=20, units='cm', dpi=600)
@@ -402,7 +402,7 @@ Another way of looking at this would be to create a correlation matrix, like we
 """
 
 # Output correlations between variables
-write_to_output('Correlations Pollution Variables', outfile, str(pm2_5_py.corr()))
+write_to_output('Correlations Pollution Variables', outfile, str(correlation(pm2_5_py)))
 
 
 